@@ -0,0 +1,416 @@
+"""
+benchmarks for vectorGame
+website: github.com/spheppner/vectorGame
+
+microbenchmarks (Vec2d, Shape, Projectiles, collision pass) at several
+entity counts, and a stress scene: a headless match with extra ships and
+a constant number of flying Lines, reporting milliseconds per frame.
+
+    python benchmark.py                          # run everything
+    python benchmark.py --json new.json          # store the results
+    python benchmark.py --baseline old.json      # compare, exit 1 on regression
+    python benchmark.py --stress --ships 20 --projectiles 5000 --frames 600
+    python benchmark.py --startup                # only the start of menu.py
+
+startup: wall time from launching `python menu.py` to its first frame,
+cold (no font cache file, see textcache.py) and warm. The run fails
+when the median is above STARTUP_BUDGET.
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from ships import catalog
+import textcache
+import vectorgame
+from vectorgame import Vec2d, Vec2dArray, Shape
+from projectiles import Projectiles
+
+SIZES = (10, 100, 1000, 10000)
+WIDTH, HEIGHT = 1440, 850
+SHIP = (1, "standard")   # player and id in data/ships.json
+STARTUP_BUDGET = {"cold": 1500.0, "warm": 1000.0}  # ms to the first menu frame, see README
+
+BENCHMARKS = []   # (name, setup) ; setup(n, screen) returns the function to time
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+def random_vectors(n):
+    return [Vec2d(random.uniform(-100, 100), random.uniform(-100, 100)) for _ in range(n)]
+
+
+def random_ships(n, screen):
+    vectorgame.PygView.width = WIDTH
+    vectorgame.PygView.height = HEIGHT
+    return [Shape(screen, Vec2d(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)),
+                  catalog.get(*SHIP), move=Vec2d(30, 10)) for _ in range(n)]
+
+
+def random_projectiles(n, owner=0):
+    p = Projectiles()
+    for i in range(n):
+        a = random.uniform(0, 2 * math.pi)
+        p.spawn((random.uniform(0, WIDTH), random.uniform(0, HEIGHT)),
+                (math.cos(a) * 1.75, math.sin(a) * 1.75),
+                color=((255,0,0), (0,0,255))[i % 2], bossnumber=owner)
+    return p
+
+
+# ---------------- microbenchmarks ----------------
+
+@benchmark("vec2d_add")
+def _(n, screen):
+    vs = random_vectors(n)
+    w = Vec2d(1.5, -2.5)
+    def run():
+        for v in vs:
+            v + w
+    return run
+
+@benchmark("vec2d_mul_scalar")
+def _(n, screen):
+    vs = random_vectors(n)
+    def run():
+        for v in vs:
+            v * 0.5
+    return run
+
+@benchmark("vec2d_iadd")
+def _(n, screen):
+    vs = random_vectors(n)
+    w = Vec2d(0.001, -0.001)
+    def run():
+        for v in vs:
+            v += w
+    return run
+
+@benchmark("vec2d_rotate")
+def _(n, screen):
+    vs = random_vectors(n)
+    def run():
+        for v in vs:
+            v.rotate(5)
+    return run
+
+@benchmark("vec2d_add_scaled")
+def _(n, screen):
+    vs = random_vectors(n)
+    w = Vec2d(0.001, -0.001)
+    def run():
+        for v in vs:
+            v.add_scaled(w, 0.5)
+    return run
+
+@benchmark("vec2darray_add")
+def _(n, screen):
+    vs = Vec2dArray.from_vectors(random_vectors(n))
+    w = Vec2d(1.5, -2.5)
+    def run():
+        vs + w
+    return run
+
+@benchmark("vec2darray_rotate")
+def _(n, screen):
+    vs = Vec2dArray.from_vectors(random_vectors(n))
+    def run():
+        vs.rotate(5)
+    return run
+
+@benchmark("shape_rotate")
+def _(n, screen):
+    ships = random_ships(n, screen)
+    def run():
+        for s in ships:
+            s.rotate(5)
+    return run
+
+@benchmark("shape_forward")
+def _(n, screen):
+    ships = random_ships(n, screen)
+    def run():
+        for s in ships:
+            s.forward(150, 0.25)
+    return run
+
+@benchmark("shape_update")
+def _(n, screen):
+    ships = random_ships(n, screen)
+    def run():
+        for s in ships:
+            s.forward(150, 0.25)
+            s.update(1 / 120.0)
+    return run
+
+@benchmark("shape_draw")
+def _(n, screen):
+    ships = random_ships(n, screen)
+    def run():
+        for s in ships:
+            s.draw()
+    return run
+
+@benchmark("projectiles_spawn")
+def _(n, screen):
+    p = random_projectiles(0)
+    p.spawn((0, 0), (1.75, 0))   # colour and atlas image exist already
+    def run():
+        p.clear()
+        for i in range(n):
+            p.spawn((i, i), (1.75, 0))
+    return run
+
+@benchmark("projectiles_draw")
+def _(n, screen):
+    p = random_projectiles(n)
+    def run():
+        p.draw(screen)
+    return run
+
+@benchmark("projectiles_advance_cull")
+def _(n, screen):
+    p = random_projectiles(n)
+    p.age[:n] = np.random.uniform(0, Projectiles.maxage, n)
+    ages = p.age[:n].copy()
+    pos = p.pos[:n].copy()
+    def run():
+        # restore, so that every call culls the same Lines
+        p.count = n
+        p.age[:n] = ages
+        p.pos[:n] = pos
+        p.advance(0.25)
+        p.expire()
+    return run
+
+@benchmark("collision")
+def _(n, screen):
+    ships = random_ships(2, screen)
+    for number, ship in enumerate(ships):
+        ship.number = number
+    p = random_projectiles(n, owner=-1)
+    view = vectorgame.PygView.__new__(vectorgame.PygView)
+    view.projectiles = p
+    view.grid = vectorgame.SpatialHash(vectorgame.PygView.critical_distance)
+    def run():
+        view.grid.rebuild(p.pos[:p.count])
+        reach = p.reach()
+        for ship in ships:
+            view.check_hits(ship, reach)
+    return run
+
+
+def measure(func, min_time=0.2):
+    """milliseconds per call of func, best of 3 rounds of at least min_time/3"""
+    func()  # warm up
+    calls = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - t
+        if elapsed >= min_time / 3:
+            break
+        calls *= 2
+    best = elapsed
+    for _ in range(2):
+        t = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, time.perf_counter() - t)
+    return best / calls * 1000.0
+
+
+def run_micro(sizes=SIZES, only=None, min_time=0.2):
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {}
+    for name, setup in BENCHMARKS:
+        if only and not any(o in name for o in only):
+            continue
+        results[name] = {}
+        for n in sizes:
+            random.seed(n)
+            ms = measure(setup(n, screen), min_time)
+            results[name][str(n)] = ms
+            print("{:28} n={:<6} {:10.4f} ms  {:8.3f} us/entity".format(name, n, ms, ms * 1000.0 / n))
+    return results
+
+
+# ---------------- stress scene ----------------
+
+def stress(ships=10, projectiles=1000, frames=300, draw=True, seed=1):
+    """headless match with extra ships and always `projectiles` flying
+       Lines. returns milliseconds per frame percentiles"""
+    random.seed(seed)
+    view = vectorgame.PygView(headless=True, visualmode=True)
+    view.paint()
+    for ship in random_ships(ships, view.screen):
+        view.players.append(ship)
+    colours = ((255,0,0), (0,0,255))
+    frame = vectorgame.keys_input(pygame.K_w, pygame.K_a, pygame.K_UP, pygame.K_RIGHT,
+                                  pygame.K_LCTRL, pygame.K_RCTRL)
+    times = []
+    for f in range(frames):
+        t = time.perf_counter()
+        missing = projectiles - view.projectiles.count
+        for i in range(missing):
+            a = random.uniform(0, 2 * math.pi)
+            view.projectiles.spawn((random.uniform(0, WIDTH), random.uniform(0, HEIGHT)),
+                                   (math.cos(a) * 1.75, math.sin(a) * 1.75),
+                                   color=colours[i % 2], bossnumber=-1)
+        for ship in view.players[2:]:
+            ship.rotate(3)
+            ship.forward(100, view.dt * vectorgame.BASE_FPS)
+        view.step(view.dt, frame)
+        # visual mode has no hit detection, do it here like a versus match
+        view.grid.rebuild(view.projectiles.pos[:view.projectiles.count])
+        reach = view.projectiles.reach()
+        hits = [view.check_hits(ship, reach) for ship in view.players]
+        view.projectiles.remove_many(np.concatenate(hits))
+        if draw:
+            view.draw()
+            view.renderer.show()
+        times.append((time.perf_counter() - t) * 1000.0)
+    pygame.quit()
+    times = np.array(times)
+    result = {"ships": ships + 2, "projectiles": projectiles, "frames": frames, "draw": draw,
+              "mean": float(times.mean()), "max": float(times.max())}
+    for q in (50, 90, 95, 99):
+        result["p%d" % q] = float(np.percentile(times, q))
+    print("stress: {ships} ships, {projectiles} projectiles, {frames} frames: "
+          "p50 {p50:.3f}  p95 {p95:.3f}  p99 {p99:.3f}  max {max:.3f} ms/frame".format(**result))
+    return result
+
+
+# ---------------- startup ----------------
+
+def startup(runs=5):
+    """median wall time (ms) of `python menu.py --startup`, cold and warm,
+       and the median of each phase menu.py reports for the warm starts"""
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    result = {}
+    phases = []
+    for kind in ("cold", "warm"):
+        times = []
+        for _ in range(runs):
+            if kind == "cold" and os.path.exists(textcache.FONT_FILE):
+                os.remove(textcache.FONT_FILE)
+            t = time.perf_counter()
+            out = subprocess.check_output([sys.executable, "menu.py", "--startup"],
+                                          env=env, stderr=subprocess.DEVNULL)
+            times.append((time.perf_counter() - t) * 1000.0)
+            if kind == "warm":
+                phases.append(json.loads(out.decode().strip().splitlines()[-1]))
+        result[kind] = float(np.median(times))
+    result["phases"] = dict((name, float(np.median([p[name] for p in phases])))
+                            for name in phases[0])
+    print("startup: cold {cold:.1f} ms  warm {warm:.1f} ms to the first menu frame".format(**result))
+    for name, ms in sorted(result["phases"].items(), key=lambda item: -item[1]):
+        print("    {:20} {:8.1f} ms".format(name, ms))
+    return result
+
+
+def over_budget(result, budget=STARTUP_BUDGET):
+    """names of startup kinds slower than the budget"""
+    slow = [kind for kind in ("cold", "warm") if result[kind] > budget[kind]]
+    for kind in slow:
+        print("startup {}: {:.1f} ms, budget {:.1f} ms  OVER BUDGET".format(kind, result[kind], budget[kind]))
+    return slow
+
+
+# ---------------- baseline comparison ----------------
+
+def compare(results, baseline, tolerance=0.25):
+    """prints new/old time ratios, returns the list of regressions"""
+    regressions = []
+    rows = []
+    for name, sizes in sorted(results.get("micro", {}).items()):
+        for n, ms in sorted(sizes.items(), key=lambda item: int(item[0])):
+            old = baseline.get("micro", {}).get(name, {}).get(n)
+            if old:
+                rows.append(("{}[{}]".format(name, n), old, ms))
+    old_stress = baseline.get("stress")
+    new_stress = results.get("stress")
+    if old_stress and new_stress:
+        for key in ("p50", "p95", "p99"):
+            rows.append(("stress " + key, old_stress[key], new_stress[key]))
+    old_startup = baseline.get("startup")
+    new_startup = results.get("startup")
+    if old_startup and new_startup:
+        for key in ("cold", "warm"):
+            rows.append(("startup " + key, old_startup[key], new_startup[key]))
+    for label, old, new in rows:
+        ratio = new / old
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(label)
+        print("{:40} {:10.4f} -> {:10.4f} ms  x{:5.2f}{}".format(label, old, new, ratio, flag))
+    return regressions
+
+
+def meta():
+    return {"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "machine": platform.platform()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="vectorGame benchmarks")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with results from this file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--only", nargs="+", help="run only benchmarks containing these names")
+    parser.add_argument("--micro", action="store_true", help="only the microbenchmarks")
+    parser.add_argument("--stress", action="store_true", help="only the stress scene")
+    parser.add_argument("--startup", action="store_true", help="only the startup time")
+    parser.add_argument("--ships", type=int, default=10)
+    parser.add_argument("--projectiles", type=int, default=1000)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--nodraw", action="store_true", help="stress scene without painting")
+    args = parser.parse_args(argv)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # data files
+    pygame.init()
+    results = {"meta": meta()}
+    everything = not (args.micro or args.stress or args.startup)
+    if args.micro or everything:
+        results["micro"] = run_micro(args.sizes, args.only)
+    if args.stress or everything:
+        results["stress"] = stress(args.ships, args.projectiles, args.frames, not args.nodraw)
+    failed = False
+    if args.startup or everything:
+        results["startup"] = startup()
+        failed = bool(over_budget(results["startup"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
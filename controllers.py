@@ -0,0 +1,150 @@
+"""
+controllers (pilots) for the ships of vectorGame
+website: github.com/spheppner/vectorGame
+
+A player of PygView is steered by a human (keyboard, joystick or
+scripted FrameInputs) or by a Controller:
+
+    view = vectorgame.PygView(controllers=(None, controllers.Bot()))
+
+Every simulation step PygView asks each controller for the buttons of
+its player (FORWARD | LEFT | FIRE ...) and puts them into the
+FrameInput of that step, in place of that player's keys. Recorded
+matches therefore replay without the controllers, see replay.py.
+"""
+
+import math
+import time
+
+import numpy as np
+
+FORWARD, BACKWARD, LEFT, RIGHT, FIRE = 1, 2, 4, 8, 16
+BUTTONS = 5   # bits per player in FrameInput.keys, in vectorgame.KEYS order
+
+
+class Controller(object):
+    """base class. reset() is called when the ships are placed, buttons()
+       once per simulation step"""
+
+    def reset(self, view, number):
+        pass
+
+    def buttons(self, view, number, seconds):
+        """bitmask of FORWARD, BACKWARD, LEFT, RIGHT and FIRE for player number"""
+        return 0
+
+
+class Bot(Controller):
+    """flies towards the other ship, keeps some distance, dodges incoming
+       projectiles and fires when the other ship is in range.
+       the cheap part (turning to the planned heading) runs every step,
+       the plan (looking at the projectiles around the ship) only every
+       few steps. the bot makes that interval longer when planning costs
+       more than `budget` seconds per step on average"""
+
+    def __init__(self, budget=0.0002, danger=160, horizon=45, max_threats=64,
+                 distance=(140, 320), fire_range=650):
+        """budget: cpu seconds per simulation step
+           danger: pixels around the ship where projectiles are checked
+           horizon: how far ahead (in 1/30 seconds) a hit is foreseen
+           max_threats: most projectiles looked at per plan, the nearest ones
+           distance: (too close, too far) from the other ship
+           fire_range: fire when the other ship is nearer"""
+        self.budget = budget
+        self.danger = danger
+        self.horizon = horizon
+        self.max_threats = max_threats
+        self.distance = distance
+        self.fire_range = fire_range
+        self.interval = 1       # steps between plans
+        self.countdown = 0
+        self.heading = 0.0      # planned angle in degrees
+        self.thrust = 0         # planned FORWARD, BACKWARD or 0
+        self.fire = False
+        self.cost = 0.0         # average seconds of one plan
+        self.plans = 0
+        self.steps = 0
+        self.seconds = 0.0      # cpu time spent in buttons()
+
+    def reset(self, view, number):
+        self.countdown = 0
+        self.heading = view.players[number].angle
+
+    def buttons(self, view, number, seconds):
+        t = time.perf_counter()
+        self.steps += 1
+        self.countdown -= 1
+        if self.countdown <= 0:
+            self.plan(view, number, seconds)
+            cost = time.perf_counter() - t
+            self.cost += (cost - self.cost) * 0.2
+            # plan 30 times a second, less often if that is over the budget
+            self.interval = min(60, max(int(round(1 / (30 * seconds))) or 1,
+                                        int(math.ceil(self.cost / self.budget))))
+            self.countdown = self.interval
+        me = view.players[number]
+        buttons = self.thrust
+        turn = (self.heading - me.angle + 180) % 360 - 180
+        step = me.template.turn * seconds * 30   # degrees of one step
+        if turn > step / 2:
+            buttons |= RIGHT
+        elif turn < -step / 2:
+            buttons |= LEFT
+        if self.thrust == FORWARD and abs(turn) > 60:
+            buttons &= ~FORWARD   # turn first
+        if self.fire:
+            buttons |= FIRE
+        self.seconds += time.perf_counter() - t
+        return buttons
+
+    def plan(self, view, number, seconds):
+        self.plans += 1
+        me = view.players[number]
+        other = view.players[1 - number]
+        x, y = me.startpoint.x, me.startpoint.y
+        dx, dy = other.startpoint.x - x, other.startpoint.y - y
+        distance = math.hypot(dx, dy)
+        self.fire = distance < self.fire_range
+        dodge = self.dodge(view, me, x, y)
+        if dodge is not None:
+            self.heading = dodge
+            self.thrust = FORWARD
+            return
+        self.heading = math.degrees(math.atan2(dy, dx))
+        if distance > self.distance[1]:
+            self.thrust = FORWARD
+        elif distance < self.distance[0]:
+            self.thrust = BACKWARD
+        else:
+            self.thrust = 0
+            self.heading += 90  # circle around the other ship
+
+    def dodge(self, view, me, x, y):
+        """heading away from the projectile that would hit first, or None"""
+        p = view.projectiles
+        near = view.grid.query(x, y, self.danger)
+        near = near[p.owner[near] != me.number]
+        if len(near) == 0:
+            return None
+        rel = p.pos[near] - (x, y)
+        if len(near) > self.max_threats:
+            # the nearest ones; the grid returns them in bucket order
+            nearest = np.argpartition((rel * rel).sum(axis=1), self.max_threats)[:self.max_threats]
+            near = near[nearest]
+            rel = rel[nearest]
+        # velocity relative to the ship, both per 1/30 second
+        vel = p.move[near] - (me.move.x / 30.0, me.move.y / 30.0)
+        speed2 = (vel * vel).sum(axis=1)
+        speed2[speed2 == 0] = 1e-9
+        t = np.clip(-(rel * vel).sum(axis=1) / speed2, 0, self.horizon)
+        closest = rel + vel * t[:, None]
+        miss = np.sqrt((closest * closest).sum(axis=1))
+        hits = miss < me.template.radius + 8
+        if not hits.any():
+            return None
+        first = np.flatnonzero(hits)[np.argmin(t[hits])]
+        vx, vy = vel[first]
+        cx, cy = closest[first]
+        # go sideways to the shot, to the side it passes less close
+        side = 1 if (cx * -vy + cy * vx) <= 0 else -1
+        return math.degrees(math.atan2(vx * side, -vy * side))
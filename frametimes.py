@@ -0,0 +1,148 @@
+"""
+frame time spans for vectorGame
+website: github.com/spheppner/vectorGame
+
+A FrameTimer splits every frame of a game loop into phases. The loop
+calls begin() at the start of a frame, lap(phase) after each phase and
+end() when the frame is shown; lap() adds the time since the last lap
+to that phase, so a phase that runs several times in one frame (like
+the simulation steps) is summed up.
+
+The last `window` frames are kept for the overlay (p50, p95 and max of
+each phase). With a log file every frame is also written there: CSV
+if the file name ends with .csv, else binary records, see read_log().
+The log is appended to, so several matches can go into one file.
+
+    timer = FrameTimer(("events", "update", "flip"), log="frames.csv")
+"""
+
+import json
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"VGFT1\n"  # first bytes of a binary log, followed by a JSON line of phase names
+
+
+class FrameTimer(object):
+
+    def __init__(self, phases, window=120, log=None, title="phase ms"):
+        """title: heading of the overlay"""
+        self.phases = tuple(phases)
+        self.title = title
+        self.window = window
+        self.history = np.zeros((window, len(self.phases)))  # ms, ring buffer
+        self.frames = 0        # frames ended so far
+        self.row = [0.0] * len(self.phases)  # seconds of the current frame
+        self.slot = dict((name, i) for i, name in enumerate(self.phases))
+        self.last = time.perf_counter()
+        self.visible = False   # overlay on or off, see toggle()
+        self.summary = None    # (p50, p95, max) arrays, see stats()
+        self.text = None       # overlay lines, made from summary
+        self.file = None
+        if log:
+            self.open_log(log)
+
+    def begin(self):
+        """start of a new frame"""
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        """the phase just ended, count the time since the last lap for it"""
+        now = time.perf_counter()
+        self.row[self.slot[phase]] += now - self.last
+        self.last = now
+
+    def end(self):
+        """the frame is done: remember it and write it to the log"""
+        row = self.row
+        ms = [s * 1000.0 for s in row]
+        self.history[self.frames % self.window] = ms
+        if self.file is not None:
+            self.write(ms)
+        self.frames += 1
+        for i in range(len(row)):
+            row[i] = 0.0
+        if self.visible and self.frames % 10 == 0:
+            self.summary = self.text = None   # new overlay numbers now and then
+
+    def stats(self):
+        """(p50, p95, max) arrays in ms per phase over the last window frames"""
+        if self.summary is None:
+            n = min(self.frames, self.window)
+            if n == 0:
+                zeros = np.zeros(len(self.phases))
+                return zeros, zeros, zeros
+            h = self.history[:n]
+            self.summary = (np.percentile(h, 50, axis=0), np.percentile(h, 95, axis=0), h.max(axis=0))
+        return self.summary
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.summary = self.text = None
+
+    def lines(self):
+        """text lines of the overlay"""
+        if self.text is not None:
+            return self.text
+        p50, p95, top = self.stats()
+        lines = ["{:16}{:>7}{:>7}{:>7}".format(self.title, "p50", "p95", "max")]
+        for i, name in enumerate(self.phases):
+            lines.append("{:16}{:7.2f}{:7.2f}{:7.2f}".format(name, p50[i], p95[i], top[i]))
+        totals = self.history[:min(self.frames, self.window)].sum(axis=1)
+        if len(totals):
+            lines.append("{:16}{:7.2f}{:7.2f}{:7.2f}".format("frame", np.percentile(totals, 50),
+                                                            np.percentile(totals, 95), totals.max()))
+        self.text = lines
+        return lines
+
+    def draw(self, screen, cache, x=10, y=70, color=(90, 90, 90), size=16):
+        """paint the overlay with a textcache.TextCache, returns the painted
+           rects. it is len(self.lines()) * size pixels high"""
+        rects = []
+        for line in self.lines():
+            rects.append(cache.draw(screen, line, x, y, color, size))
+            y += size
+        return rects
+
+    # ------------- log file ----------------
+
+    def open_log(self, filename):
+        self.csv = filename.endswith(".csv")
+        self.file = open(filename, "a" if self.csv else "ab")
+        self.record = struct.Struct("<I%df" % len(self.phases))
+        if self.file.tell() == 0:
+            if self.csv:
+                self.file.write(",".join(("frame",) + self.phases) + "\n")
+            else:
+                self.file.write(MAGIC + json.dumps(self.phases).encode() + b"\n")
+
+    def write(self, ms):
+        if self.csv:
+            self.file.write("{},{}\n".format(self.frames, ",".join("%.4f" % t for t in ms)))
+        else:
+            self.file.write(self.record.pack(self.frames, *ms))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_log(filename):
+    """phase names and an (frames, 1 + phases) array of a log file.
+       column 0 is the frame number, the others are ms per phase"""
+    if filename.endswith(".csv"):
+        with open(filename) as f:
+            header = f.readline().strip().split(",")
+        return tuple(header[1:]), np.loadtxt(filename, delimiter=",", skiprows=1, ndmin=2)
+    with open(filename, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("not a frame time log: " + filename)
+    end = data.index(b"\n", len(MAGIC))
+    phases = tuple(json.loads(data[len(MAGIC):end].decode()))
+    dtype = np.dtype([("frame", "<u4"), ("ms", "<f4", (len(phases),))])
+    records = np.frombuffer(data[end + 1:], dtype=dtype)
+    return phases, np.column_stack((records["frame"], records["ms"]))
@@ -3,30 +3,54 @@
 Menu System by Simon Heppner
 simon@heppner.at
 https://github.com/spheppner/vectorGame
+
+python menu.py --startup   shows the first frame, quits and prints how
+                           long each phase of the start took (ms)
 """
 
+import time
+STARTED = time.perf_counter() # before the other imports
 
 import pygame 
 import textscroller_vertical
 import random
 import sys
 import os.path
-import vectorgame
+import json
+import textcache
+import profiling
+import ships
+from renderer import Renderer
+from scenes import Stage
+from frametimes import FrameTimer
+# vectorgame is imported when the first match starts
+
+STARTUP = [] # (phase, milliseconds) from launching menu.py to the first frame
+_phase_start = [STARTED]
+
+def startup_phase(name):
+    """remember how long the startup phase called name took"""
+    now = time.perf_counter()
+    STARTUP.append((name, (now - _phase_start[0]) * 1000.0))
+    _phase_start[0] = now
+
+startup_phase("imports")
 
 class Settings(object):
     menu = {"root":["Play", "Shop Player1", "Shop Player2", "Help", "Credits", "Options","Quit"],
             "Options":["Turn music off","Turn sound off","Change screen resolution"],
             "Change screen resolution":["640x400","800x640","1024x800"],
             "Credits":["Simon HEPPNER","Horst JENS"],
-            "Play":["Versus","Visual"],
+            "Play":["Versus","Versus Bot","Visual"],
             "Shop Player1":["Planes","Colours"],
             "Shop Player2":["Planes2","Colours2"],
-            "Planes":["Rectangle","Diamond","Space Shuttle","Dagger","Rocket"],
-            "Planes2":["Pacman","Arrow"],
+            "Planes":ships.catalog.names(1, shop=True), # from data/ships.json
+            "Planes2":ships.catalog.names(2, shop=True),
             "Colours":["Yellow","Green"],
             "Colours":["Light Blue","Purple"],
             } 
         
+startup_phase("ship catalog")
 
 
 class Menu(object):
@@ -88,30 +112,43 @@ class Menu(object):
 class PygView(object):
     width = 640
     height = 400
-    def __init__(self, width=640, height=400, fps=30):
+    def __init__(self, width=640, height=400, fps=30, dirty=False, stage=None, max_frames=None,
+                 threaded=False):
         """Initialize pygame, window, background, font,...
            default arguments 
+           dirty=True updates only the changed parts of the window, see renderer.py
+           stage: scenes.Stage shared with the game and the textscroller
+           max_frames: leave the menu after so many frames
+           threaded: games run their simulation in a thread, see simthread.py
         """
-        
-        pygame.mixer.pre_init(44100, -16, 2, 2048) 
-
-        pygame.init()
-
-        pygame.display.set_caption("Press ESC to quit")
         PygView.width = width
         PygView.height = height
-        self.set_resolution()
+        if stage is None:
+            stage = Stage(width, height, dirty)
+        self.stage = stage
+        self.dirty = stage.dirty
         self.clock = pygame.time.Clock()
         self.fps = fps
         self.playtime = 0.0
-        self.font = pygame.font.SysFont('mono', 24, bold=True)
+        self.frames = 0
+        self.max_frames = max_frames
+        self.threaded = threaded
+        self.timer = FrameTimer(("events", "wait", "draw", "flip")) # F3 shows it
+        self.font = textcache.cache.font('mono', 24, bold=True)
+        startup_phase("fonts")
+        self.enter()
+
+    def enter(self):
+        """get the window back from a game or textscroller, see scenes.py"""
+        pygame.display.set_caption("Press ESC to quit")
+        self.set_resolution()
         with open("data/vectis_file.txt", "r") as self.vectis_file:
             self.vectis = self.vectis_file.read()
         
     def set_resolution(self):
-        self.screen = pygame.display.set_mode((self.width, self.height), pygame.DOUBLEBUF)
-        self.background = pygame.Surface(self.screen.get_size()).convert()  
-        self.background.fill((255,255,255)) # fill background white
+        self.screen = self.stage.resize(self.width, self.height)
+        self.background = self.stage.background((255,255,255)) # white
+        self.renderer = Renderer(self.screen, self.background, self.dirty)
 
     def paint(self):
         """painting on the surface"""
@@ -128,13 +165,19 @@ class PygView(object):
         """
         #self.paint() 
         running = True
+        timer = self.timer
         while running:
+            timer.begin()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False 
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
+                    if event.key == pygame.K_F3:
+                        timer.toggle()
+                    if event.key == pygame.K_F9:
+                        profiling.profiler.toggle()
                     if event.key==pygame.K_DOWN or event.key == pygame.K_KP2:
                         m.nextitem()
                         print(m.active_itemnumber)
@@ -157,16 +200,20 @@ class PygView(object):
                         
                         # important: no elif here, instead if, because every menupoint could contain an 'x'        
                         elif result=="Versus":
-                            vectorgame.PygView().run()
-                            print("activating external program") 
-                            self.__init__()
+                            import vectorgame
+                            self.stage.play(vectorgame.PygView(stage=self.stage, threaded=self.threaded))
+                        elif result=="Versus Bot":
+                            import vectorgame, controllers
+                            self.stage.play(vectorgame.PygView(stage=self.stage, threaded=self.threaded,
+                                            controllers=(None, controllers.Bot())))
                         elif result=="Visual":
-                            vectorgame.PygView(visualmode=True).run()
-                            print("activating external program")
-                            self.__init__()
+                            # the other, automated player flies around
+                            import vectorgame, controllers
+                            self.stage.play(vectorgame.PygView(visualmode=True, stage=self.stage, threaded=self.threaded,
+                                            controllers=(None, controllers.Bot())))
                         elif result == "Help":
                             text="You need to\ncontrol a ship\nand make graphics\nwhile the other, automated\nplayer flies around!"
-                            textscroller_vertical.PygView(text, self.width, self.height).run()
+                            self.stage.play(textscroller_vertical.PygView(text, self.width, self.height, stage=self.stage))
                         elif result == "Turn music off":
                             #TURN MUSIC OFF
                             Settings.menu["Options"][0] = "Turn music on"
@@ -181,26 +228,38 @@ class PygView(object):
                             Settings.menu["Options"][1] = "Turn sound off"
                         elif result == "Simon HEPPNER":
                             text="Programmer of this\ngame. Likes Yoghurt!\n:D"
-                            textscroller_vertical.PygView(text, self.width, self.height).run()
+                            self.stage.play(textscroller_vertical.PygView(text, self.width, self.height, stage=self.stage))
                         elif result == "Horst JENS":
                             text="Programming-Teacher of\nSimon HEPPNER.\nIs pleased to contribute!"
-                            textscroller_vertical.PygView(text, self.width, self.height).run()
+                            self.stage.play(textscroller_vertical.PygView(text, self.width, self.height, stage=self.stage))
                         elif result=="Quit":
                             print("Bye")
-                            pygame.quit()
+                            self.stage.quit()
                             sys.exit()
                                             
 
-            milliseconds = self.clock.tick(self.fps)
+            # the first frame does not wait for the frame rate
+            timer.lap("events")
+            milliseconds = self.clock.tick(self.fps if self.frames else 0)
             self.playtime += milliseconds / 1000.0 
+            timer.lap("wait")
             self.draw_text("FPS: {:6.3}{}VECTIS: {}".format(
                            self.clock.get_fps(), " "*5, self.vectis), color=(30, 120 ,18))
-            pygame.draw.line(self.screen,(random.randint(0,255),random.randint(0,255), random.randint(0,255)),(50,self.height - 80),(self.width -50,self.height - 80) ,3)             
+            self.renderer.add(pygame.draw.line(self.screen,(random.randint(0,255),random.randint(0,255), random.randint(0,255)),(50,self.height - 80),(self.width -50,self.height - 80) ,3))             
             self.paint()
-            pygame.display.flip()
-            self.screen.blit(self.background, (0, 0))
+            if timer.visible:
+                self.renderer.add(timer.draw(self.screen, textcache.cache, x=self.width - 300, y=10))
+            timer.lap("draw")
+            self.renderer.show()
+            timer.lap("flip")
+            timer.end()
+            self.frames += 1
+            if self.frames == 1:
+                startup_phase("first frame")
+            if self.frames == self.max_frames:
+                running = False
             
-        pygame.quit()
+        self.stage.quit()
 
 
     def draw_text(self, text ,x=50 , y=0,color=(27,135,177)):
@@ -209,9 +268,9 @@ class PygView(object):
         
         """Center text in window
         """
-        fw, fh = self.font.size(text)
-        surface = self.font.render(text, True, color)
-        self.screen.blit(surface, (x,y))
+        rect = textcache.cache.draw(self.screen, text, x, y, color)
+        self.renderer.add(rect)
+        return rect
 
     
 ####
@@ -220,4 +279,11 @@ if __name__ == '__main__':
 
     # call with width of window and fps
     m=Menu(Settings.menu)
-    PygView().run()
+    stage = Stage(PygView.width, PygView.height, dirty="--dirty" in sys.argv)
+    startup_phase("pygame")
+    stage.play(PygView(stage=stage, max_frames=1 if "--startup" in sys.argv else None,
+                       threaded="--threaded" in sys.argv))
+    if "--startup" in sys.argv:
+        phases = dict(STARTUP)
+        phases["total"] = sum(ms for phase, ms in STARTUP)
+        print(json.dumps(phases, sort_keys=True))
@@ -0,0 +1,656 @@
+"""
+LAN multiplayer over UDP for vectorGame
+website: github.com/spheppner/vectorGame
+
+The host runs the only simulation (a headless PygView whose players are
+steered by RemoteControllers) and sends a snapshot of the match to every
+client `tick_rate` times a second. Clients only paint and send the
+buttons of their player (FORWARD | LEFT | FIRE ..., see controllers.py):
+
+    python network.py host                    # server and a window for player 1
+    python network.py join 192.168.0.7        # player 2, from another machine
+    python network.py join 192.168.0.7 --spectate
+    python network.py bench --clients 8       # loopback test, no windows
+
+Snapshots are quantized (positions in 1/4 pixel, angles in 1/65536 turn,
+projectile moves in 1/4096 pixel per frame) and delta-compressed against
+the newest snapshot the client has acknowledged: only changed ship
+fields, projectiles spawned since then and projectiles removed by a hit.
+Projectiles that expire by age are removed by the client itself. A client
+whose acknowledged snapshot is too old gets a full one (delta against
+EMPTY). Lost packets need no resend: the next delta contains everything
+since the acknowledged snapshot again.
+
+Clients paint `delay` ticks in the past and interpolate the ships between
+the two snapshots around that time; projectiles are moved on from the
+tick they were sent with.
+
+Packets, all little endian:
+    client -> server
+    HELLO   tag 0, wanted player (0, 1, ANY or SPECTATOR)
+    INPUT   tag 1, newest snapshot tick received (uint32), buttons (uint8)
+    BYE     tag 2
+    server -> client
+    WELCOME tag 0, player number (or SPECTATOR, FULL), JSON settings
+    SNAPSHOT tag 1, tick, base tick (uint32), winner (uint8),
+            per player: field mask (uint8) and the fields in the mask
+            (x, y: int16, angle: uint16, hitpoints: int16),
+            spawn count, gone count (uint16),
+            spawns (SPAWN), serials of the gone projectiles (uint32)
+"""
+
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import random
+import select
+import socket
+import struct
+import sys
+import time
+
+import numpy as np
+
+import vectorgame
+from controllers import Controller, BUTTONS
+from projectiles import Projectiles
+
+PORT = 47800
+TICK_RATE = 20
+MAX_CLIENTS = 8
+HISTORY = 64          # snapshots the server keeps for deltas (3 seconds at 20 ticks)
+TIMEOUT = 5.0         # seconds without a packet until a client is dropped
+
+ANY, SPECTATOR, FULL = 255, 254, 253
+HELLO, INPUT, BYE = 0, 1, 2
+WELCOME, SNAPSHOT = 0, 1
+
+HEADER = struct.Struct("<BIIB")
+COUNTS = struct.Struct("<HH")
+# serial, ticks since the record was made, x, y, move x, move y, colour, age in 1/16 frames
+SPAWN = struct.Struct("<IHhhhhBH")
+INPUT_PACKET = struct.Struct("<BIB")
+# x, y, angle, hitpoints; one Struct for every field mask
+SHIP_FIELDS = "hhHh"
+SHIP = [struct.Struct("<" + "".join(f for bit, f in enumerate(SHIP_FIELDS) if mask >> bit & 1))
+        for mask in range(1 << len(SHIP_FIELDS))]
+
+POSITION = 4.0        # quantization steps per pixel
+MOVE = 4096.0         # ... per pixel per frame
+ANGLE = 65536 / 360.0
+AGE = 16.0            # ... per frame
+
+# ships: one (x, y, angle, hitpoints) tuple per player, quantized
+# projectiles: serial -> (tick, x, y, mx, my, colour, age), the state of
+#              the shot at that tick, quantized. records never change
+State = collections.namedtuple("State", "tick ships projectiles winner")
+EMPTY = State(0, None, {}, 0)
+
+
+def quantize(values, step, low=-32768, high=32767):
+    return np.clip(np.round(np.asarray(values) * step), low, high).astype(int)
+
+
+def alive(record, tick, tick_frames):
+    """True while the projectile of record has not expired at tick.
+       the same test the server's Projectiles.expire() makes"""
+    return record[6] / AGE + (tick - record[0]) * tick_frames < Projectiles.maxage
+
+
+def encode(base, state, tick_frames):
+    """SNAPSHOT packet of state as a delta against base (EMPTY for a full one)"""
+    parts = [HEADER.pack(SNAPSHOT, state.tick, base.tick, state.winner)]
+    for number, ship in enumerate(state.ships):
+        old = base.ships[number] if base.ships else None
+        mask = 0
+        for bit, value in enumerate(ship):
+            if old is None or old[bit] != value:
+                mask |= 1 << bit
+        parts.append(bytes((mask,)))
+        parts.append(SHIP[mask].pack(*[v for bit, v in enumerate(ship) if mask >> bit & 1]))
+    old = base.projectiles
+    spawns = [(serial, record) for serial, record in state.projectiles.items() if serial not in old]
+    new = state.projectiles
+    gone = [serial for serial, record in old.items()
+            if serial not in new and alive(record, state.tick, tick_frames)]
+    parts.append(COUNTS.pack(len(spawns), len(gone)))
+    for serial, (tick, x, y, mx, my, colour, age) in spawns:
+        parts.append(SPAWN.pack(serial, state.tick - tick, x, y, mx, my, colour, age))
+    parts.append(struct.pack("<%dI" % len(gone), *gone))
+    return b"".join(parts)
+
+
+def decode(data, states, tick_frames):
+    """State of a SNAPSHOT packet, or None if its base is not in states
+       (a dict tick -> State of the snapshots received before)"""
+    _, tick, base_tick, winner = HEADER.unpack_from(data)
+    base = EMPTY if base_tick == 0 else states.get(base_tick)
+    if base is None:
+        return None
+    pos = HEADER.size
+    ships = []
+    for number in range(2):
+        mask = data[pos]
+        pos += 1
+        values = iter(SHIP[mask].unpack_from(data, pos))
+        pos += SHIP[mask].size
+        old = base.ships[number] if base.ships else (0, 0, 0, 0)
+        ships.append(tuple(next(values) if mask >> bit & 1 else old[bit] for bit in range(4)))
+    spawns, gone = COUNTS.unpack_from(data, pos)
+    pos += COUNTS.size
+    records = []
+    for _ in range(spawns):
+        serial, since, x, y, mx, my, colour, age = SPAWN.unpack_from(data, pos)
+        pos += SPAWN.size
+        records.append((serial, (tick - since, x, y, mx, my, colour, age)))
+    gone = set(struct.unpack_from("<%dI" % gone, data, pos))
+    projectiles = {serial: record for serial, record in base.projectiles.items()
+                   if serial not in gone and alive(record, tick, tick_frames)}
+    projectiles.update(records)
+    return State(tick, tuple(ships), projectiles, winner)
+
+
+class RemoteController(Controller):
+    """the buttons last received from the client flying this player"""
+
+    def __init__(self):
+        self.bits = 0
+
+    def buttons(self, view, number, seconds):
+        return self.bits
+
+
+class Server(object):
+    """sends snapshots of view (a headless PygView whose controllers are
+       RemoteControllers) to up to max_clients clients"""
+
+    def __init__(self, view, address=("", PORT), tick_rate=TICK_RATE, max_clients=MAX_CLIENTS):
+        self.view = view
+        self.steps_per_tick = max(1, int(round(view.sim_rate / float(tick_rate))))
+        self.tick_rate = view.sim_rate / float(self.steps_per_tick)
+        self.tick_frames = self.steps_per_tick * view.dt * 30.0   # BASE_FPS frames per tick
+        self.max_clients = max_clients
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(address)
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+        self.clients = {}     # address -> [player, acked tick, last packet time]
+        self.history = collections.OrderedDict()  # tick -> State
+        view.paint()
+        self.palette = {}     # (r,g,b) -> colour number in the snapshots
+        for colours in view.shot_colours:
+            for colour in colours:
+                self.palette.setdefault(tuple(colour), len(self.palette))
+        self.state = EMPTY
+        self.last_serial = 0  # newest shot in self.state
+        # statistics
+        self.ticks = 0
+        self.sent = 0         # bytes of snapshots
+        self.packets = 0
+        self.full = 0         # snapshots sent without delta
+        self.received = 0     # bytes from clients
+        self.sim_seconds = 0.0
+        self.net_seconds = 0.0
+
+    def settings(self, player):
+        view = self.view
+        return {"player": player, "seed": view.seed, "width": view.width, "height": view.height,
+                "sim_rate": view.sim_rate, "tick_rate": self.tick_rate,
+                "planes": [view.active_plane, view.active_plane2],
+                "colours": [view.active_colour, view.active_colour2],
+                "palette": sorted(self.palette, key=self.palette.get)}
+
+    def players(self):
+        return sorted(c[0] for c in self.clients.values() if c[0] < 2)
+
+    def receive(self):
+        """handle all waiting client packets"""
+        now = time.perf_counter()
+        while True:
+            try:
+                data, address = self.socket.recvfrom(2048)
+            except (BlockingIOError, ConnectionError):
+                break
+            self.received += len(data)
+            if not data:
+                continue
+            client = self.clients.get(address)
+            if data[0] == HELLO and len(data) == 2:
+                if client is None:
+                    if len(self.clients) >= self.max_clients:
+                        self.socket.sendto(bytes((WELCOME, FULL)), address)
+                        continue
+                    free = [n for n in (0, 1) if n not in self.players()]
+                    player = SPECTATOR
+                    if data[1] in free or (data[1] == ANY and free):
+                        player = data[1] if data[1] in free else free[0]
+                    client = self.clients[address] = [player, 0, now]
+                welcome = json.dumps(self.settings(client[0])).encode()
+                self.socket.sendto(bytes((WELCOME, client[0])) + welcome, address)
+            elif client is None:
+                continue
+            elif data[0] == INPUT and len(data) == INPUT_PACKET.size:
+                _, acked, buttons = INPUT_PACKET.unpack(data)
+                client[1] = max(client[1], acked)
+                client[2] = now
+                if client[0] < 2:
+                    self.view.controllers[client[0]].bits = buttons & ((1 << BUTTONS) - 1)
+            elif data[0] == BYE:
+                self.drop(address)
+        for address, client in list(self.clients.items()):
+            if now - client[2] > TIMEOUT:
+                self.drop(address)
+
+    def drop(self, address):
+        player = self.clients.pop(address)[0]
+        if player < 2:
+            self.view.controllers[player].bits = 0
+
+    def capture(self, tick):
+        """State of the view at tick. records of projectiles already in
+           the last State are reused, only new shots are quantized"""
+        view = self.view
+        p = view.projectiles
+        n = p.count
+        serials = p.serial[:n]
+        old = self.state.projectiles
+        # serials only grow and the order of the rows is kept: new shots are at the end
+        first = int(np.searchsorted(serials, self.last_serial, side="right"))
+        projectiles = {serial: old[serial] for serial in serials[:first].tolist()}
+        if n:
+            self.last_serial = max(self.last_serial, int(serials[-1]))
+        if first < n:
+            colours = [self.palette[p.palette[c]] for c in p.color[first:n].tolist()]
+            x, y = quantize(p.pos[first:n], POSITION).T.tolist()
+            mx, my = quantize(p.move[first:n], MOVE).T.tolist()
+            ages = quantize(p.age[first:n], AGE, 0, 65535).tolist()
+            for serial, record in zip(serials[first:].tolist(),
+                                      zip(x, y, mx, my, colours, ages)):
+                projectiles[serial] = (tick,) + record
+        ships = tuple((int(round(s.startpoint.x * POSITION)), int(round(s.startpoint.y * POSITION)),
+                       int(round(s.angle % 360 * ANGLE)) & 0xFFFF,
+                       max(-32768, min(32767, int(s.hitpoints))))
+                      for s in view.players)
+        self.state = State(tick, ships, projectiles, view.winner or 0)
+        self.history[tick] = self.state
+        while len(self.history) > HISTORY:
+            self.history.popitem(last=False)
+        return self.state
+
+    def send(self):
+        """the newest State to every client, as delta against what it acked"""
+        state = self.state
+        packets = {}   # base tick -> packet, most clients acked the same tick
+        for address, client in self.clients.items():
+            base = self.history.get(client[1], EMPTY)
+            if base is EMPTY:
+                self.full += 1
+            packet = packets.get(base.tick)
+            if packet is None:
+                packet = packets[base.tick] = encode(base, state, self.tick_frames)
+            try:
+                self.socket.sendto(packet, address)
+            except OSError:
+                continue   # too large or unreachable, the next tick tries again
+            self.sent += len(packet)
+            self.packets += 1
+
+    def run(self, players=2, seconds=None, linger=1.0):
+        """wait until `players` clients fly a ship, then play the match in
+           real time. ends at the winner (after sending it for linger
+           seconds), after seconds or when all clients are gone"""
+        view = self.view
+        while len(self.players()) < min(players, 2) or len(self.clients) < players:
+            select.select([self.socket], [], [], 0.1)
+            self.receive()
+        dt = view.dt
+        start = next_step = time.perf_counter()
+        end = None
+        steps = 0   # also after the winner, for the ticks
+        while True:
+            now = time.perf_counter()
+            if now < next_step:
+                select.select([self.socket], [], [], next_step - now)
+                self.receive()
+                continue
+            if now - next_step > view.max_lag:
+                next_step = now   # give up catching up, like PygView.run()
+            t = time.perf_counter()
+            if not view.winner:
+                view.step(dt, vectorgame.NO_INPUT)
+            self.sim_seconds += time.perf_counter() - t
+            next_step += dt
+            steps += 1
+            if steps % self.steps_per_tick == 0:
+                t = time.perf_counter()
+                self.receive()
+                if not self.state.winner:   # afterwards the last State is sent again
+                    self.capture(steps // self.steps_per_tick)
+                self.send()
+                self.ticks += 1
+                self.net_seconds += time.perf_counter() - t
+            if view.winner and end is None:
+                end = now + linger
+            if (end is not None and now > end) or (seconds is not None and now - start > seconds):
+                break
+            if not self.clients:
+                break   # everybody left
+        view.close_logs()
+
+    def close(self):
+        self.socket.close()
+
+
+class Client(object):
+    """receives the snapshots of a Server and sends the buttons of its player"""
+
+    def __init__(self, host="127.0.0.1", port=PORT, player=ANY, delay=2.0, timeout=10.0):
+        """delay: paint so many ticks in the past, for interpolation"""
+        self.server = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.delay = delay
+        self.states = collections.OrderedDict()   # tick -> State
+        self.latest = EMPTY
+        self.arrived = {}     # tick -> local time
+        self.offset = None    # local time - tick * tick seconds, smoothed
+        self.received = 0
+        self.dropped = 0      # snapshots whose base was unknown
+        self.sprites = {}     # serial -> atlas index of the shot
+        self.store = None     # Projectiles with the atlas of this client
+        self.settings = self.connect(player, timeout)
+        self.player = self.settings["player"]
+        self.tick_seconds = 1.0 / self.settings["tick_rate"]
+        self.tick_frames = self.tick_seconds * 30.0
+
+    def connect(self, player, timeout):
+        """HELLO until the WELCOME, returns the settings of the match"""
+        give_up = time.perf_counter() + timeout
+        while time.perf_counter() < give_up:
+            self.socket.sendto(bytes((HELLO, player)), self.server)
+            if select.select([self.socket], [], [], 0.5)[0]:
+                try:
+                    data = self.socket.recv(65536)
+                except ConnectionError:
+                    continue   # server not up yet
+                if data[0] != WELCOME:
+                    continue
+                if data[1] == FULL:
+                    raise RuntimeError("server {}:{} is full".format(*self.server))
+                return json.loads(data[2:].decode())
+        raise RuntimeError("no answer from server {}:{}".format(*self.server))
+
+    def poll(self, loss=0.0):
+        """decode every waiting snapshot. loss drops that part of them, for tests"""
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except (BlockingIOError, ConnectionError):
+                break
+            if not data or data[0] != SNAPSHOT or (loss and random.random() < loss):
+                continue
+            self.received += len(data)
+            state = decode(data, self.states, self.tick_frames)
+            if state is None:
+                self.dropped += 1
+                continue
+            if state.tick <= self.latest.tick:
+                continue   # late
+            now = time.perf_counter()
+            self.states[state.tick] = self.latest = state
+            while len(self.states) > HISTORY:
+                self.states.popitem(last=False)
+            sample = now - state.tick * self.tick_seconds
+            if self.offset is None or sample < self.offset:
+                self.offset = sample    # the fastest packet so far
+            else:
+                self.offset += (sample - self.offset) * 0.05
+
+    def send(self, buttons):
+        self.socket.sendto(INPUT_PACKET.pack(INPUT, self.latest.tick, buttons), self.server)
+
+    def bye(self):
+        self.socket.sendto(bytes((BYE,)), self.server)
+        self.socket.close()
+
+    def render_tick(self, now):
+        """the tick (a float) to paint now"""
+        if self.offset is None:
+            return 0.0
+        tick = (now - self.offset) / self.tick_seconds - self.delay
+        return max(min(tick, self.latest.tick), next(iter(self.states), 0))
+
+    def ships(self, tick):
+        """(x, y, angle, hitpoints) of both players at tick, interpolated.
+           empty before the first snapshot"""
+        if not self.states:
+            return []
+        before = after = None
+        for t in reversed(self.states):
+            if t <= tick:
+                before = self.states[t]
+                break
+            after = self.states[t]
+        if before is None:
+            before = after
+        if after is None or after is before:
+            after = before
+        share = 0.0 if after is before else (tick - before.tick) / float(after.tick - before.tick)
+        ships = []
+        for (x0, y0, a0, hp0), (x1, y1, a1, hp1) in zip(before.ships, after.ships):
+            turn = (a1 - a0 + 32768) % 65536 - 32768
+            ships.append(((x0 + (x1 - x0) * share) / POSITION, (y0 + (y1 - y0) * share) / POSITION,
+                          (a0 + turn * share) / ANGLE, hp0 if share < 1 else hp1))
+        return ships
+
+    def projectiles(self, tick):
+        """a Projectiles store with the shots of the latest snapshot,
+           where they are at tick"""
+        store = self.store
+        if store is None:
+            store = self.store = Projectiles()
+            for colour in self.settings["palette"]:
+                store.color_index(colour)
+        records = self.latest.projectiles
+        if not records:
+            return store.rows(np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0, dtype=int))
+        serials = list(records)
+        a = np.array(list(records.values()), dtype=float)
+        frames = (tick - a[:, 0]) * self.tick_frames
+        age = a[:, 6] / AGE + frames
+        move = a[:, 3:5] / MOVE
+        pos = a[:, 1:3] / POSITION + move * frames[:, None]
+        sprites = self.sprites
+        for serial, record in zip(serials, records.values()):
+            if serial not in sprites:
+                sprites[serial] = store.sprite_for(record[5], (record[3] / MOVE, record[4] / MOVE))
+        if len(sprites) > 4 * len(records) + 1000:
+            self.sprites = sprites = {s: sprites[s] for s in serials}
+        sprite = np.array([sprites[s] for s in serials])
+        show = (age >= 0) & (age < Projectiles.maxage)
+        return store.rows(pos[show], move[show], sprite[show])
+
+
+def serve(host="", port=PORT, players=2, seed=None, tick_rate=TICK_RATE, seconds=None,
+          max_clients=MAX_CLIENTS, ready=None):
+    """play one match as server. returns the Server (with its statistics)
+       and the result of the match. ready (a multiprocessing Event) is set
+       when the socket is open"""
+    view = vectorgame.PygView(headless=True, seed=seed,
+                              controllers=(RemoteController(), RemoteController()))
+    server = Server(view, (host, port), tick_rate, max_clients)
+    if ready is not None:
+        ready.set()
+    try:
+        server.run(players, seconds)
+    finally:
+        server.close()
+    return server, view.result()
+
+
+def play(client, fps=60):
+    """window for a Client: paints the snapshots and sends the keys.
+       either set of keys (WASD or arrows, with ctrl) flies the ship"""
+    import pygame
+    s = client.settings
+    # the server simulates and records: no input log or snapshots here
+    view = vectorgame.PygView(width=s["width"], height=s["height"], fps=fps, seed=s["seed"],
+                              planes=s["planes"], colours=s["colours"],
+                              record=False, rewind=False)
+    pygame.display.set_caption("vectorGame | {} | Press ESC to quit".format(
+        "spectator" if client.player > 1 else "player {}".format(client.player + 1)))
+    view.paint()
+    view.alpha = 1.0
+    mask = (1 << BUTTONS) - 1
+    running = True
+    try:
+        while running:
+            view.clock.tick(fps)
+            running = view.handle_events()
+            client.poll()
+            keys = view.read_input().keys
+            if client.player < 2:
+                client.send((keys | keys >> BUTTONS) & mask)
+            else:
+                client.send(0)
+            tick = client.render_tick(time.perf_counter())
+            if client.states:
+                for player, (x, y, angle, hitpoints) in zip(view.players, client.ships(tick)):
+                    player.startpoint.set(x, y)
+                    player.prevpoint.set(x, y)
+                    player.angle = angle
+                    player.hitpoints = hitpoints
+                view.aim()
+                view.projectiles = client.projectiles(tick)
+            view.draw()
+            if client.latest.winner:
+                view.winner = client.latest.winner
+                view.draw_gameover()
+                view.renderer.show()
+                time.sleep(5)
+                break
+            view.renderer.show()
+    finally:
+        client.bye()
+        view.close_logs()
+        view.stage.quit()
+
+
+def bench_clients(port, clients, loss, seed, done, results):
+    """the clients of bench(), in their own process: decode every
+       snapshot and press random buttons 60 times a second, without
+       painting, until done is set"""
+    random.seed(seed)
+    flock = [Client("127.0.0.1", port) for _ in range(clients)]
+    buttons = [0] * clients
+    while not done.is_set():
+        select.select([c.socket for c in flock], [], [], 1 / 60.0)
+        for number, client in enumerate(flock):
+            client.poll(loss)
+            if random.random() < 0.02:
+                buttons[number] = random.randrange(1 << BUTTONS)
+            client.send(buttons[number])
+            client.ships(client.render_tick(time.perf_counter()))
+            client.projectiles(client.render_tick(time.perf_counter()))
+    results.put([(c.player, c.latest.tick, c.received, c.dropped, len(c.latest.projectiles))
+                 for c in flock])
+    for client in flock:
+        client.bye()
+
+
+def bench(clients=8, seconds=20.0, tick_rate=TICK_RATE, loss=0.0, seed=1, port=PORT):
+    """server in this process, clients in another one, on loopback.
+       prints bytes per tick and client and the cpu time of the host"""
+    results = multiprocessing.Queue()
+    done = multiprocessing.Event()
+    worker = multiprocessing.Process(target=bench_clients,
+                                     args=(port, clients, loss, seed, done, results))
+    worker.start()
+    cpu = time.process_time()
+    started = time.perf_counter()
+    server, result = serve("127.0.0.1", port, clients, seed, tick_rate, seconds, max(clients, 2))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu
+    done.set()
+    flock = results.get()
+    worker.join()
+    ticks = max(server.ticks, 1)
+    report = {"clients": clients, "tick_rate": server.tick_rate, "ticks": server.ticks,
+              "frames": result["frames"], "winner": result["winner"],
+              "bytes_per_tick": server.sent / float(ticks),
+              "bytes_per_tick_client": server.sent / float(max(server.packets, 1)),
+              "full_snapshots": server.full,
+              "input_bytes_per_second": server.received / wall,
+              "host_cpu": cpu / wall,
+              "sim_ms_per_tick": server.sim_seconds * 1000.0 / ticks,
+              "net_ms_per_tick": server.net_seconds * 1000.0 / ticks,
+              "projectiles": len(server.state.projectiles),
+              "client_dropped": sum(c[3] for c in flock),
+              "client_ticks": [c[1] for c in flock]}
+    print("{clients} clients, {ticks} ticks at {tick_rate:.0f}/s, {projectiles} projectiles at the end".format(**report))
+    print("snapshots: {bytes_per_tick_client:.0f} bytes per tick and client, "
+          "{bytes_per_tick:.0f} bytes per tick, {full_snapshots} full".format(**report))
+    print("inputs: {input_bytes_per_second:.0f} bytes per second".format(**report))
+    print("host: {:.0%} of one core, simulation {sim_ms_per_tick:.2f} ms and "
+          "network {net_ms_per_tick:.2f} ms per tick".format(report["host_cpu"], **report))
+    print("clients: {client_dropped} snapshots without base".format(**report))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="vectorGame over the LAN")
+    commands = parser.add_subparsers(dest="command")
+    host = commands.add_parser("host", help="run the server and play player 1")
+    host.add_argument("--dedicated", action="store_true", help="no window, only the server")
+    host.add_argument("--players", type=int, default=2, help="clients to wait for")
+    host.add_argument("--seed", type=int)
+    join = commands.add_parser("join", help="play on a server")
+    join.add_argument("host")
+    join.add_argument("--player", type=int, choices=(1, 2))
+    join.add_argument("--spectate", action="store_true")
+    join.add_argument("--delay", type=float, default=2.0, help="interpolation delay in ticks")
+    bench_parser = commands.add_parser("bench", help="loopback test without windows")
+    bench_parser.add_argument("--clients", type=int, default=MAX_CLIENTS)
+    bench_parser.add_argument("--seconds", type=float, default=20.0)
+    bench_parser.add_argument("--loss", type=float, default=0.0, help="part of the snapshots to drop")
+    bench_parser.add_argument("--seed", type=int, default=1)
+    bench_parser.add_argument("--json", help="write the result to this file")
+    for p in (host, join, bench_parser):
+        p.add_argument("--port", type=int, default=PORT)
+    for p in (host, bench_parser):
+        p.add_argument("--tick-rate", type=float, default=TICK_RATE)
+    args = parser.parse_args(argv)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # data files
+    if args.command == "bench":
+        report = bench(args.clients, args.seconds, args.tick_rate, args.loss, args.seed, args.port)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=1)
+    elif args.command == "join":
+        player = SPECTATOR if args.spectate else ANY if args.player is None else args.player - 1
+        play(Client(args.host, args.port, player, args.delay))
+    elif args.command == "host":
+        if args.dedicated:
+            server, result = serve("", args.port, args.players, args.seed, args.tick_rate)
+            print(result)
+            return 0
+        ready = multiprocessing.Event()
+        worker = multiprocessing.Process(target=serve, kwargs=dict(
+            port=args.port, players=args.players, seed=args.seed, tick_rate=args.tick_rate,
+            ready=ready))
+        worker.start()
+        ready.wait(10.0)   # without a server the Client gives up with an error
+        try:
+            play(Client("127.0.0.1", args.port, 0))
+        finally:
+            worker.join(TIMEOUT + 1.0)   # the server ends when its clients are gone
+            if worker.is_alive():
+                worker.kill()
+    else:
+        parser.print_help()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
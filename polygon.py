@@ -0,0 +1,56 @@
+"""
+exact polygon tests for vectorGame (narrowphase of the hit detection)
+website: github.com/spheppner/vectorGame
+
+All functions work on numpy arrays: one polygon (k,2) against many
+points or segments (n,2) at once.
+"""
+
+import numpy as np
+
+
+def edges(polygon):
+    """returns start and end points (k,2) of all polygon edges.
+       the polygon may or may not repeat its first point at the end"""
+    polygon = np.asarray(polygon, dtype=float)
+    if len(polygon) > 1 and (polygon[0] == polygon[-1]).all():
+        polygon = polygon[:-1]
+    return polygon, np.roll(polygon, -1, axis=0)
+
+
+def points_in_polygon(polygon, points):
+    """even-odd rule: True for every point inside the polygon"""
+    a, b = edges(polygon)
+    px = points[:, 0:1]
+    py = points[:, 1:2]
+    x1, y1, x2, y2 = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+    straddle = (y1 > py) != (y2 > py)       # (n,k)
+    dy = np.where(y2 == y1, 1.0, y2 - y1)   # no crossing where y1 == y2 anyway
+    xcross = x1 + (py - y1) * (x2 - x1) / dy
+    crossings = np.count_nonzero(straddle & (px < xcross), axis=1)
+    return crossings % 2 == 1
+
+
+def segments_cross_polygon(polygon, starts, ends):
+    """True for every segment starts[i]-ends[i] crossing a polygon edge"""
+    a, b = edges(polygon)
+    edge = b - a                            # (k,2)
+    seg = ends - starts                     # (n,2)
+
+    def cross(u, v):
+        return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+    # on which side of each edge are the segment ends, and vice versa
+    d1 = cross(edge, starts[:, None, :] - a)
+    d2 = cross(edge, ends[:, None, :] - a)
+    d3 = cross(seg[:, None, :], a - starts[:, None, :])
+    d4 = cross(seg[:, None, :], b - starts[:, None, :])
+    return ((d1 * d2 < 0) & (d3 * d4 < 0)).any(axis=1)
+
+
+def segments_hit_polygon(polygon, starts, ends):
+    """True for every segment that starts inside or crosses the polygon"""
+    if len(starts) == 0:
+        return np.zeros(0, dtype=bool)
+    return (points_in_polygon(polygon, starts) |
+            segments_cross_polygon(polygon, starts, ends))
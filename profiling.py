@@ -0,0 +1,150 @@
+"""
+on-demand profiler for vectorGame
+website: github.com/spheppner/vectorGame
+
+F9 in the menu, the game or the textscroller starts cProfile, F9 again
+stops it. Every capture is written to profiles/<name>-<date>-<time>.prof
+(open it with pstats or snakeviz) together with a .txt file of the
+top functions by cumulative time. To profile from the very start:
+
+    VECTORGAME_PROFILE=1 python menu.py
+
+A capture still running when the program ends is stopped and written
+then, and a short top-N report of all captures is printed.
+
+cProfile only sees the thread that enabled it. A thread of its own (the
+SimThread of PygView(threaded=True)) calls profiler.follow() in its
+loop: it gets a profile of its own while a capture runs, which is
+merged into the capture when it stops.
+"""
+
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+
+ENV = "VECTORGAME_PROFILE"
+
+
+class Profiler(object):
+
+    def __init__(self, name="vectorgame", directory="profiles", top=15):
+        self.name = name
+        self.directory = directory
+        self.top = top
+        self.profile = None   # cProfile.Profile of the main thread while capturing
+        self.started = 0.0
+        self.number = 0       # of the current or last capture
+        self.handed = threading.Condition()
+        self.running = set()  # profiles of other threads, not handed in yet
+        self.threads = []     # profiles handed in for the current capture
+        self.captures = []    # (filename, seconds) of written captures
+        self.exit_registered = False
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def start_from_env(self):
+        """start capturing if $VECTORGAME_PROFILE is set (and not 0)"""
+        if os.environ.get(ENV, "0") not in ("", "0") and not self.active:
+            self.start()
+
+    def start(self):
+        if self.active:
+            return
+        if not self.exit_registered:
+            atexit.register(self.exit)
+            self.exit_registered = True
+        with self.handed:
+            self.number += 1
+            self.threads = []
+        self.profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        """stop capturing, write the files. returns the .prof filename"""
+        if not self.active:
+            return None
+        self.profile.disable()
+        seconds = time.perf_counter() - self.started
+        profile, self.profile = self.profile, None
+        with self.handed:
+            # the other threads hand in their profiles at their next loop
+            self.handed.wait_for(lambda: not any(n == self.number for n, p in self.running),
+                                 timeout=1.0)
+            threads, self.threads = self.threads, []
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        base = os.path.join(self.directory, "{}-{}".format(self.name, time.strftime("%Y%m%d-%H%M%S")))
+        filename = base + ".prof"
+        number = 1
+        while os.path.exists(filename):   # several captures in one second
+            number += 1
+            filename = "{}-{}.prof".format(base, number)
+        stats = pstats.Stats(profile)
+        for other in threads:
+            stats.add(other)
+        stats.dump_stats(filename)
+        with open(filename[:-5] + ".txt", "w") as f:
+            f.write(self.report(filename, self.top))
+        self.captures.append((filename, seconds))
+        print("profile of {:.1f} seconds ({} threads) written to {}".format(
+            seconds, 1 + len(threads), filename))
+        return filename
+
+    def follow(self, following=None, done=False):
+        """profile the calling thread along with the captures. a thread
+           of its own calls this in every loop with what it returned the
+           last time, and with done=True when it ends"""
+        if following is not None:
+            number, profile = following
+            if done or not self.active or number != self.number:
+                profile.disable()
+                with self.handed:
+                    self.running.discard(following)
+                    if number == self.number:
+                        self.threads.append(profile)
+                    self.handed.notify_all()
+                following = None
+        if following is None and self.active and not done:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # python 3.12 and later: the profile of the main thread
+                # already sees every thread
+                return None
+            following = (self.number, profile)
+            with self.handed:
+                self.running.add(following)
+        return following
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    @staticmethod
+    def report(filename, top=15):
+        """the top functions of a capture by cumulative time, as text"""
+        stream = io.StringIO()
+        stats = pstats.Stats(filename, stream=stream)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+        return stream.getvalue()
+
+    def exit(self):
+        self.stop()
+        for filename, seconds in self.captures:
+            print("---- {} ({:.1f} s) ----".format(filename, seconds))
+            text = self.report(filename, 5)
+            # only the table, without the pstats header lines
+            print(text[text.find("   ncalls"):].rstrip())
+
+
+profiler = Profiler()
@@ -0,0 +1,204 @@
+"""
+array-backed projectile store for vectorGame
+website: github.com/spheppner/vectorGame
+
+All flying Lines (projectiles) of a match live in one Projectiles
+object. Instead of one python object per shot, position, velocity,
+age, owner (bossnumber) and colour index are kept in numpy arrays,
+so moving and culling are done for all projectiles at once.
+
+Projectiles are painted from a small atlas of pre-rendered line images,
+one per colour and direction (quantized to `directions` steps). The
+atlas grows while a match goes on and is shared by all projectiles,
+all of them are blitted with one Surface.blits call.
+"""
+
+import math
+import numpy as np
+import pygame
+
+
+class Projectiles(object):
+    """structure-of-arrays store for projectiles.
+       only the first self.count rows of each array are alive.
+       """
+    maxage = 400     # age (in frames at 30 fps) when a projectile disappears
+    length = 10      # drawn line is move * length pixels long
+    directions = 64  # atlas images per colour and line length
+    columns = ("pos", "move", "age", "owner", "color", "sprite", "serial")
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.palette = []        # colour index -> (r,g,b)
+        self.palette_index = {}  # (r,g,b) -> colour index
+        self.pos = np.zeros((capacity, 2))
+        self.move = np.zeros((capacity, 2))
+        self.age = np.zeros(capacity)
+        self.owner = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.sprite = np.zeros(capacity, dtype=np.int32)   # index into atlas
+        self.serial = np.zeros(capacity, dtype=np.int64)   # number of the shot in the match
+        self.serials = 0              # shots spawned so far
+        self.images = []              # sprite index -> Surface
+        self.sprite_index = {}        # (colour index, direction, length) -> sprite index
+        self.offsets = np.zeros((0, 2)) # sprite index -> topleft of image relative to pos
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        """double the capacity of all arrays"""
+        capacity = len(self.age) * 2
+        for name in self.columns:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def color_index(self, color):
+        """returns the palette index of an (r,g,b) colour, adds it if new"""
+        color = tuple(color)
+        if color not in self.palette_index:
+            self.palette_index[color] = len(self.palette)
+            self.palette.append(color)
+        return self.palette_index[color]
+
+    def spawn(self, startpoint, move, color=(0,0,255), bossnumber=0):
+        """add one projectile, returns its (current) index"""
+        if self.count == len(self.age):
+            self._grow()
+        i = self.count
+        self.pos[i] = startpoint[0], startpoint[1]
+        self.move[i] = move[0], move[1]
+        self.age[i] = 0
+        self.owner[i] = bossnumber
+        self.color[i] = self.color_index(color)
+        self.sprite[i] = self.sprite_for(self.color[i], move)
+        self.serials += 1
+        self.serial[i] = self.serials
+        self.count += 1
+        return i
+
+    def advance(self, steps=1.0):
+        """move all projectiles and let them age. move is the way of one
+           frame at 30 fps, steps says how many of these frames passed"""
+        n = self.count
+        self.pos[:n] += self.move[:n] * steps
+        self.age[:n] += steps
+
+    def expire(self):
+        """remove all projectiles older than maxage"""
+        n = self.count
+        self.keep(self.age[:n] < self.maxage)
+
+    def keep(self, mask):
+        """compact the arrays, keeping only rows where mask is True"""
+        n = self.count
+        alive = int(np.count_nonzero(mask))
+        if alive == n:
+            return
+        for name in self.columns:
+            a = getattr(self, name)
+            a[:alive] = a[:n][mask]
+        self.count = alive
+
+    def remove(self, i):
+        """remove projectile i by moving the last projectile into its place.
+           the order of projectiles is not preserved"""
+        last = self.count - 1
+        if i != last:
+            for name in self.columns:
+                a = getattr(self, name)
+                a[i] = a[last]
+        self.count = last
+
+    def remove_many(self, indices):
+        """remove several projectiles at once (indices may be unsorted)"""
+        mask = np.ones(self.count, dtype=bool)
+        mask[indices] = False
+        self.keep(mask)
+
+    def reach(self):
+        """length of the longest projectile line"""
+        n = self.count
+        if n == 0:
+            return 0.0
+        m = self.move[:n]
+        return float(np.sqrt((m * m).sum(axis=1)).max()) * self.length
+
+    def clear(self):
+        self.count = 0
+
+    def pack(self):
+        """the alive rows of all columns as bytes, see unpack"""
+        n = self.count
+        return b"".join(getattr(self, name)[:n].tobytes() for name in self.columns)
+
+    def unpack(self, data, count):
+        """make the count rows packed by pack() (data may be a memoryview)
+           the alive projectiles. colours and sprites index the palette
+           and atlas of this store, which only grow"""
+        while len(self.age) < count:
+            self._grow()
+        offset = 0
+        for name in self.columns:
+            a = getattr(self, name)
+            values = np.frombuffer(data, a.dtype, count * a[0].size, offset)
+            a[:count] = values.reshape((count,) + a.shape[1:])
+            offset += values.nbytes
+        self.count = count
+        return offset
+
+    def snapshot(self):
+        """a copy of the projectiles alive now that can be drawn while this
+           store goes on changing (in another thread). shares the atlas,
+           which only ever grows"""
+        n = self.count
+        return self.rows(self.pos[:n].copy(), self.move[:n].copy(), self.sprite[:n].copy())
+
+    def rows(self, pos, move, sprite):
+        """a store only for draw(), with these rows and the atlas of this one"""
+        store = Projectiles.__new__(Projectiles)
+        store.count = len(sprite)
+        store.pos = pos
+        store.move = move
+        store.sprite = sprite
+        store.images = self.images
+        store.offsets = self.offsets
+        return store
+
+    def sprite_for(self, color_index, move):
+        """returns the atlas index of the image for a colour and a move
+           vector, renders the image if it is not in the atlas yet"""
+        mx, my = move[0], move[1]
+        direction = int(round(math.atan2(my, mx) / (2 * math.pi) * self.directions)) % self.directions
+        length = int(round(math.hypot(mx, my) * self.length))
+        key = (int(color_index), direction, length)
+        if key not in self.sprite_index:
+            angle = direction * 2 * math.pi / self.directions
+            ex = math.cos(angle) * length
+            ey = math.sin(angle) * length
+            ox = 1 + max(0.0, -ex)    # start of the line inside the image
+            oy = 1 + max(0.0, -ey)
+            image = pygame.Surface((int(math.ceil(abs(ex))) + 3, int(math.ceil(abs(ey))) + 3))
+            pygame.draw.line(image, self.palette[key[0]], (ox, oy), (ox + ex, oy + ey), 1)
+            image.set_colorkey((0,0,0), pygame.RLEACCEL) # make black transparent
+            if pygame.display.get_surface() is not None:
+                image = image.convert() # for faster blitting
+            self.sprite_index[key] = len(self.images)
+            self.images.append(image)
+            self.offsets = np.vstack((self.offsets, (-ox, -oy)))
+        return self.sprite_index[key]
+
+    def draw(self, screen, rects=False, back=0.0):
+        """paint every projectile from the atlas, in one blits call.
+           back paints them where they were so many steps ago.
+           with rects=True returns the list of painted Rects"""
+        n = self.count
+        sprites = self.sprite[:n]
+        topleft = self.pos[:n] + self.offsets[sprites]
+        if back:
+            topleft -= self.move[:n] * back
+        topleft = topleft.tolist()
+        images = self.images
+        return screen.blits([(images[s], xy) for s, xy in zip(sprites.tolist(), topleft)], rects)
@@ -0,0 +1,69 @@
+"""
+full-screen or dirty-rectangle screen updates for vectorGame
+website: github.com/spheppner/vectorGame
+
+The game loops paint on self.screen and call show() once per frame.
+With dirty=False that is the classic display.flip() followed by
+blitting the whole background. With dirty=True the loop reports every
+rect it painted with add(); show() pushes only those rects (and the
+ones of the last frame, which have to be erased on the display) with
+display.update(rects) and then restores just those areas from the
+background. When the painted area grows above `threshold` of the
+window, show() falls back to a full flip for that frame. The first
+frame is always a full flip, because anything painted before the loop
+started was never reported.
+"""
+
+import pygame
+
+
+class Renderer(object):
+
+    def __init__(self, screen, background, dirty=False, threshold=0.4):
+        self.screen = screen
+        self.background = background
+        self.dirty = dirty
+        self.threshold = threshold
+        self.rects = []         # painted in this frame
+        self.old_rects = []     # painted in the last frame
+        self.full_next = True   # next show() must flip the whole screen
+        self.full_frames = 0    # frames shown with display.flip
+        self.dirty_frames = 0   # frames shown with display.update(rects)
+
+    def add(self, rect):
+        """remember a painted Rect (or a list of Rects)"""
+        if not self.dirty or rect is None:
+            return
+        if isinstance(rect, pygame.Rect):
+            self.rects.append(rect)
+        else:
+            self.rects.extend(rect)
+
+    def dirty_area(self, rects):
+        """summed area of all rects inside the screen (overlaps count twice)"""
+        clip = self.screen.get_rect()
+        area = 0
+        for r in rects:
+            r = r.clip(clip)
+            area += r.width * r.height
+        return area
+
+    def show(self):
+        """push this frame to the display and clear the screen for the next one"""
+        if self.dirty:
+            update = self.old_rects + self.rects
+            w, h = self.screen.get_size()
+            if not self.full_next and self.dirty_area(update) <= self.threshold * w * h:
+                pygame.display.update(update)
+                for r in self.rects:
+                    self.screen.blit(self.background, r, r)
+                self.old_rects = self.rects
+                self.rects = []
+                self.dirty_frames += 1
+                return
+            self.old_rects = self.rects
+            self.rects = []
+        pygame.display.flip()
+        self.screen.blit(self.background, (0, 0))
+        self.full_next = False
+        self.full_frames += 1
@@ -0,0 +1,172 @@
+"""
+input recording and replay for vectorGame
+website: github.com/spheppner/vectorGame
+
+A match only depends on its settings (seed, planes, colours, window
+size, sim_rate) and on the FrameInput of every simulation step. An
+InputRecorder appends both to a binary log; replaying the inputs with
+the same settings gives the same match, frame by frame.
+
+    VECTORGAME_RECORD=matches.vgi python menu.py    # record every match
+    python replay.py matches.vgi                    # watch the last one again
+    python replay.py matches.vgi --match 0 --headless
+
+Log format, append-only, one segment per match:
+    MAGIC, one JSON line with the settings, then records:
+    tag 0: repeat count (uint32), keys (uint16)        all axes and buttons 0
+    tag 1: repeat count, keys, 8 axes (float64), 2 buttons (uint32)
+    tag 2: end of the match
+Equal inputs of consecutive steps are stored once with a repeat count.
+Records are collected in a bytearray and written in large blocks.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+MAGIC = b"VGIN1\n"
+SHORT = struct.Struct("<BIH")
+LONG = struct.Struct("<BIH8d2I")
+END = struct.Struct("<B")
+RECORD_SIZE = {0: SHORT.size, 1: LONG.size, 2: END.size}   # by tag
+
+
+class InputRecorder(object):
+
+    def __init__(self, filename, settings, flush_bytes=64 * 1024):
+        """settings: dict of everything needed to start the match again"""
+        self.file = open(filename, "ab")
+        self.file.write(MAGIC + json.dumps(settings, sort_keys=True).encode() + b"\n")
+        self.flush_bytes = flush_bytes
+        self.buffer = bytearray()
+        self.last = None   # FrameInput of the running repeat
+        self.count = 0     # steps with that input
+        self.steps = 0
+
+    def record(self, frame):
+        """the FrameInput of one simulation step"""
+        self.steps += 1
+        if frame == self.last:
+            self.count += 1
+            return
+        self.push()
+        self.last = frame
+        self.count = 1
+
+    def push(self):
+        """move the running repeat into the buffer"""
+        frame = self.last
+        if frame is None:
+            return
+        if any(frame.axes) or any(frame.buttons):
+            self.buffer += LONG.pack(1, self.count, frame.keys, *(frame.axes + frame.buttons))
+        else:
+            self.buffer += SHORT.pack(0, self.count, frame.keys)
+        self.last = None
+        if len(self.buffer) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+
+    def close(self):
+        """end of the match"""
+        if self.file is None:
+            return
+        self.push()
+        self.buffer += END.pack(2)
+        self.flush()
+        self.file.close()
+        self.file = None
+
+
+def read_log(filename):
+    """list of (settings, runs) for every match in the log.
+       runs is a list of (count, FrameInput)"""
+    from vectorgame import FrameInput, JOYSTICKS, AXES
+    with open(filename, "rb") as f:
+        data = f.read()
+    matches = []
+    pos = 0
+    while pos < len(data):
+        if not data.startswith(MAGIC, pos):
+            raise ValueError("broken input log {} at byte {}".format(filename, pos))
+        end = data.find(b"\n", pos + len(MAGIC))
+        if end < 0:
+            break   # cut off in the settings line
+        settings = json.loads(data[pos + len(MAGIC):end].decode())
+        pos = end + 1
+        runs = []
+        # a match without end record was cut off; the next one starts with
+        # MAGIC. a crash usually cuts the last record too: the runs before
+        # it are kept and reading stops there
+        while pos < len(data) and not data.startswith(MAGIC, pos):
+            tag = data[pos]
+            size = RECORD_SIZE.get(tag, 0)
+            if pos + size > len(data):
+                pos = len(data)
+                break
+            if tag == 2:
+                pos += END.size
+                break
+            elif tag == 0:
+                _, count, keys = SHORT.unpack_from(data, pos)
+                frame = FrameInput(keys, (0.0,) * (JOYSTICKS * AXES), (0,) * JOYSTICKS)
+                pos += SHORT.size
+            elif tag == 1:
+                values = LONG.unpack_from(data, pos)
+                count, keys = values[1], values[2]
+                frame = FrameInput(keys, values[3:3 + JOYSTICKS * AXES], values[3 + JOYSTICKS * AXES:])
+                pos += LONG.size
+            else:
+                raise ValueError("broken input log {} at byte {}".format(filename, pos))
+            runs.append((count, frame))
+        matches.append((settings, runs))
+    return matches
+
+
+def inputs(runs):
+    """the FrameInput of every step, from the runs of read_log"""
+    for count, frame in runs:
+        for _ in range(count):
+            yield frame
+
+
+def replay(settings, runs, headless=False, **kwargs):
+    """play a recorded match again, returns PygView.result()"""
+    import vectorgame
+    view = vectorgame.PygView(width=settings["width"], height=settings["height"],
+                              visualmode=settings["visualmode"], sim_rate=settings["sim_rate"],
+                              seed=settings["seed"], planes=settings["planes"],
+                              colours=settings["colours"], headless=headless,
+                              inputs=inputs(runs), **kwargs)
+    view.run()
+    return view.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="replay a recorded vectorGame match")
+    parser.add_argument("log", help="input log written with VECTORGAME_RECORD")
+    parser.add_argument("--match", type=int, default=-1, help="number of the match in the log (default: last)")
+    parser.add_argument("--headless", action="store_true", help="no window, as fast as possible")
+    parser.add_argument("--list", action="store_true", help="only list the matches in the log")
+    args = parser.parse_args(argv)
+    matches = read_log(args.log)
+    if args.list:
+        for number, (settings, runs) in enumerate(matches):
+            print("{:3} {} steps  seed {seed}  planes {planes}  colours {colours}  {date}".format(
+                  number, sum(count for count, frame in runs), **settings))
+        return 0
+    settings, runs = matches[args.match]
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # data files
+    t = time.perf_counter()
+    result = replay(settings, runs, args.headless)
+    print(result, "{:.2f} s".format(time.perf_counter() - t))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+rewind and seek for vectorGame
+website: github.com/spheppner/vectorGame
+
+Every `every` simulation steps PygView packs the whole state of the
+match (pose, velocity, angle and hitpoints of both ships, every
+projectile, shots fired and reload) with struct and numpy into a
+RingBuffer, a bytearray of fixed size allocated once. When it is full
+the oldest snapshots are overwritten; snapshots older than `seconds`
+are dropped as well.
+
+    Backspace in the game       back `step_back` seconds (5)
+    view.rewind.seek(view, frame)   to the newest snapshot at or before frame
+    view.rewind.back(view, seconds)
+
+Seeking restores a snapshot directly, nothing is simulated again; the
+match goes on from there and the snapshots after it are dropped.
+Packing costs a few microseconds per 100 projectiles. If that is more
+than `budget` seconds per step on average, snapshots are taken less
+often. An input recording (see replay.py) ends at the first seek, as
+the recorded inputs would no longer replay the match.
+"""
+
+import collections
+import math
+import struct
+import time
+
+# frames, playtime, reload of both players, fired of both players,
+# winner, projectile count, projectile serials
+HEADER = struct.Struct("<Id2d2IBIQ")
+# startpoint, prevpoint, move (x, y each), angle, hitpoints
+SHIP = struct.Struct("<7dq")
+
+# frame: PygView.frames of the snapshot, start and size in RingBuffer.data
+Entry = collections.namedtuple("Entry", "frame start size")
+
+
+class RingBuffer(object):
+    """snapshots of different sizes in one bytearray. entries are
+       written one after the other and wrap to the start when the next
+       one does not fit at the end, overwriting the oldest"""
+
+    def __init__(self, capacity):
+        self.data = bytearray(capacity)
+        self.entries = collections.deque()   # Entry, oldest first
+        self.head = 0                        # where the next entry is written
+
+    def __len__(self):
+        return len(self.entries)
+
+    def used(self):
+        return sum(e.size for e in self.entries)
+
+    def put(self, frame, data):
+        """store data, returns False if it is larger than the whole buffer"""
+        size = len(data)
+        if size > len(self.data):
+            return False
+        entries = self.entries
+        if self.head + size > len(self.data):
+            # the entries behind head are the oldest ones, the space
+            # after the last of them is not used this round
+            while entries and entries[0].start >= self.head:
+                entries.popleft()
+            self.head = 0
+        end = self.head + size
+        while entries and entries[0].start < end and entries[0].start >= self.head:
+            entries.popleft()
+        self.data[self.head:end] = data
+        entries.append(Entry(frame, self.head, size))
+        self.head = end
+        return True
+
+    def get(self, entry):
+        return memoryview(self.data)[entry.start:entry.start + entry.size]
+
+    def find(self, frame):
+        """newest entry at or before frame (the oldest one if all are newer)"""
+        for entry in reversed(self.entries):
+            if entry.frame <= frame:
+                return entry
+        return self.entries[0] if self.entries else None
+
+    def truncate(self, entry):
+        """drop every entry newer than entry; the next one is written after it"""
+        while self.entries[-1] is not entry:
+            self.entries.pop()
+        self.head = entry.start + entry.size
+
+    def expire(self, frame):
+        """drop entries older than frame, except the newest one"""
+        while len(self.entries) > 1 and self.entries[0].frame < frame:
+            self.entries.popleft()
+
+
+class Rewind(object):
+
+    def __init__(self, every=30, seconds=180.0, max_bytes=32 * 1024 * 1024,
+                 budget=0.00002, step_back=5.0):
+        """every: simulation steps between snapshots (at least)
+           seconds: how far back snapshots are kept
+           max_bytes: size of the ring buffer
+           budget: cpu seconds per simulation step for the snapshots
+           step_back: seconds of one rewind by hotkey"""
+        self.every = every
+        self.seconds = seconds
+        self.budget = budget
+        self.step_back = step_back
+        self.buffer = RingBuffer(max_bytes)
+        self.interval = every
+        self.countdown = 0
+        self.cost = 0.0       # average seconds of one capture
+        self.captures = 0
+        self.seeks = 0
+        self.skipped = 0      # snapshots larger than the whole buffer
+
+    def reset(self):
+        """forget all snapshots, for a new match"""
+        self.buffer.entries.clear()
+        self.buffer.head = 0
+        self.countdown = 0
+
+    def pack(self, view):
+        p = view.projectiles
+        parts = [HEADER.pack(view.frames, view.playtime, view.reload[0], view.reload[1],
+                             view.fired[0], view.fired[1], view.winner or 0, p.count, p.serials)]
+        for s in view.players:
+            parts.append(SHIP.pack(s.startpoint.x, s.startpoint.y, s.prevpoint.x, s.prevpoint.y,
+                                   s.move.x, s.move.y, s.angle, int(s.hitpoints)))
+        parts.append(p.pack())
+        return b"".join(parts)
+
+    def unpack(self, view, data):
+        (view.frames, view.playtime, reload1, reload2, fired1, fired2, winner,
+         count, serials) = HEADER.unpack_from(data)
+        view.reload = [reload1, reload2]
+        view.fired = [fired1, fired2]
+        view.winner = winner or None
+        offset = HEADER.size
+        for s in view.players:
+            x, y, px, py, mx, my, s.angle, s.hitpoints = SHIP.unpack_from(data, offset)
+            s.startpoint.set(x, y)
+            s.prevpoint.set(px, py)
+            s.move.set(mx, my)
+            offset += SHIP.size
+        view.projectiles.unpack(data[offset:], count)
+        view.projectiles.serials = serials
+
+    def capture(self, view):
+        """called after every simulation step, packs a snapshot every
+           interval steps"""
+        self.countdown -= 1
+        if self.countdown > 0:
+            return
+        t = time.perf_counter()
+        if self.buffer.put(view.frames, self.pack(view)):
+            self.buffer.expire(view.frames - self.seconds * view.sim_rate)
+            self.captures += 1
+        else:
+            self.skipped += 1
+        cost = time.perf_counter() - t
+        self.cost += (cost - self.cost) * 0.2
+        # every `every` steps, less often if that is over the budget
+        self.interval = max(self.every, int(math.ceil(self.cost / self.budget)))
+        self.countdown = self.interval
+
+    def frames(self):
+        """simulation steps of all snapshots, oldest first"""
+        return [entry.frame for entry in self.buffer.entries]
+
+    def seek(self, view, frame):
+        """go back to the newest snapshot at or before frame. returns the
+           frame of that snapshot, or None if there is none"""
+        entry = self.buffer.find(frame)
+        if entry is None:
+            return None
+        self.unpack(view, self.buffer.get(entry))
+        self.buffer.truncate(entry)
+        self.countdown = self.interval
+        self.seeks += 1
+        view.aim()
+        for number, controller in enumerate(view.controllers):
+            if controller is not None:
+                controller.reset(view, number)
+        if view.recorder is not None:
+            view.recorder.close()
+            view.recorder = None
+        return entry.frame
+
+    def back(self, view, seconds=None):
+        """seek to `seconds` (default step_back) before the current step"""
+        if seconds is None:
+            seconds = self.step_back
+        return self.seek(view, view.frames - int(seconds * view.sim_rate))
@@ -0,0 +1,83 @@
+"""
+one window for all screens of vectorGame
+website: github.com/spheppner/vectorGame
+
+The menu, the game and the textscroller are scenes. They share one
+Stage: pygame is initialized once, the window is made once (and only
+changed when a scene needs another size), the joysticks are opened
+once and fonts stay in textcache. A scene is played on top of the
+current one and, when its run() returns, the scene below gets the
+window back without any pygame.init() or pygame.quit():
+
+    stage = Stage(640, 400)
+    stage.play(menu.PygView(stage=stage))
+
+A scene is any object with run() and enter(). enter() is called before
+run() and again whenever a scene played on top of it has ended; it sets
+caption, window size and background.
+"""
+
+import os
+import pygame
+import profiling
+
+
+class Stage(object):
+
+    def __init__(self, width=640, height=400, dirty=False, headless=False):
+        """dirty=True: scenes update only the changed parts of the window
+           headless=True: no window, no sound, no joysticks"""
+        self.headless = headless
+        self.dirty = dirty
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        else:
+            pygame.mixer.pre_init(44100, -16, 2, 2048)
+        pygame.init()
+        profiling.profiler.start_from_env()
+        self.joysticks = []
+        if not headless:
+            pygame.joystick.init()
+            self.joysticks = [pygame.joystick.Joystick(x) for x in range(pygame.joystick.get_count())]
+            for j in self.joysticks:
+                j.init()
+        self.screen = None
+        self.backgrounds = {}  # (size, colour) -> Surface
+        self.stack = []        # scenes played at the moment, topmost last
+        self.set_modes = 0
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        """window of this size. set_mode is only called if the size changed"""
+        if self.screen is None or self.screen.get_size() != (width, height):
+            self.screen = pygame.display.set_mode((width, height), pygame.DOUBLEBUF)
+            self.set_modes += 1
+        return self.screen
+
+    def background(self, color=(255, 255, 255)):
+        """plain background surface of the window size, made once per size
+           and colour. scenes must not paint on it"""
+        key = (self.screen.get_size(), tuple(color))
+        surface = self.backgrounds.get(key)
+        if surface is None:
+            surface = pygame.Surface(key[0]).convert()
+            surface.fill(color)
+            self.backgrounds[key] = surface
+        return surface
+
+    def play(self, scene):
+        """run scene on top of the current one and return what its run()
+           returns. afterwards the scene below is entered again"""
+        self.stack.append(scene)
+        try:
+            scene.enter()
+            return scene.run()
+        finally:
+            self.stack.pop()
+            if self.stack and pygame.get_init():
+                self.stack[-1].enter()
+
+    def quit(self):
+        self.backgrounds.clear()
+        pygame.quit()
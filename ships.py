@@ -0,0 +1,140 @@
+"""
+ship catalog for vectorGame
+website: github.com/spheppner/vectorGame
+
+All ship types (outline, default colour, stats) are defined in
+data/ships.json. The file is parsed once into ShipTemplates.
+catalog.refresh() reads the file again only if it was changed since
+the last load, and computes rotation tables and bounds of all ships
+that do not have them yet. The menu only needs the names and does not
+wait for the tables.
+The game, the menu and the shop all ask the same catalog:
+
+    import ships
+    template = ships.catalog.get(1, "dagger")
+    names = ships.catalog.names(2, shop=True)
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+
+class ShipTemplate(object):
+    """immutable outline of a ship type. the outline turned by every
+       multiple of `resolution` degrees is computed once, when it is first
+       needed, and shared by all ships of this type. turning a ship is
+       then a table lookup, and the outline never drifts.
+       the stats (hitpoints, friction, thrust, reverse, turn) are read
+       by Shape and PygView"""
+    hitpoints = 1000
+    friction = 0.5
+    thrust = 150     # push per 1/30 second while going forward
+    reverse = -50    # push per 1/30 second while going backward
+    turn = 5         # degrees per 1/30 second
+    colour = "red"   # shot colour if the player has none
+    shop = True      # offered in the shop; false for the ships everyone has
+
+    def __init__(self, pointlist, name=None, resolution=1.0, **stats):
+        self.name = name
+        self.points = tuple((float(p[0]), float(p[1])) for p in pointlist)
+        self.resolution = resolution
+        self.steps = int(round(360.0 / resolution))
+        self.radius = max(math.hypot(x, y) for x, y in self.points) # bounding circle
+        for key, value in stats.items():
+            setattr(self, key, value)
+        self._table = None
+
+    def _build(self):
+        base = np.array(self.points)                       # (k,2)
+        radians = np.radians(np.arange(self.steps) * self.resolution)[:, None]
+        cos, sin = np.cos(radians), np.sin(radians)
+        x, y = base[:, 0], base[:, 1]
+        table = np.stack((x*cos - y*sin, x*sin + y*cos), axis=2)  # (steps,k,2)
+        table.flags.writeable = False
+        self._table = table
+        self._poses = [tuple(map(tuple, pose)) for pose in table.tolist()]
+        self._mins = table.min(axis=1).tolist()
+        self._maxs = table.max(axis=1).tolist()
+
+    def index(self, angle):
+        """table row of the outline turned by angle degrees"""
+        if self._table is None:
+            self._build()
+        return int(round(angle / self.resolution)) % self.steps
+
+    def pose(self, angle):
+        """outline turned by angle degrees, as tuple of (x,y) tuples"""
+        i = self.index(angle)
+        return self._poses[i]
+
+    def outline(self, angle):
+        """outline turned by angle degrees, as read-only (k,2) array"""
+        i = self.index(angle)
+        return self._table[i]
+
+    def aabb(self, angle):
+        """(minx, miny, maxx, maxy) of the outline turned by angle degrees"""
+        i = self.index(angle)
+        return tuple(self._mins[i] + self._maxs[i])
+
+
+class ShipCatalog(object):
+    """all ShipTemplates of a ships.json file, by player (1 or 2) and id"""
+
+    def __init__(self, filename=os.path.join("data", "ships.json")):
+        self.filename = filename
+        self.mtime = None
+        self.ships = {}     # (player, id) -> ShipTemplate, in file order
+        self.loads = 0
+        self.built = False  # all rotation tables computed
+
+    def refresh(self, build=True):
+        """(re)load the file if it changed since the last load.
+           build=True also computes all rotation tables and bounds"""
+        mtime = os.path.getmtime(self.filename)
+        if mtime != self.mtime:
+            self.load()
+            self.mtime = mtime
+        if build and not self.built:
+            for template in self.ships.values():
+                template.index(0)
+            self.built = True
+        return self
+
+    def load(self):
+        with open(self.filename, "r") as f:
+            data = json.load(f)
+        defaults = data.get("defaults", {})
+        ships = {}
+        for entry in data["ships"]:
+            stats = dict(defaults)
+            stats.update(entry)
+            outline = stats.pop("outline")
+            name = stats.pop("name", stats["id"])
+            template = ShipTemplate(outline, name, **stats)
+            ships[(template.player, template.id)] = template
+        self.ships = ships
+        self.built = False
+        self.loads += 1
+
+    def get(self, player, id):
+        """template of ship `id` for player 1 or 2"""
+        if self.mtime is None:
+            self.refresh()
+        return self.ships[(player, id)]
+
+    def templates(self, player):
+        if self.mtime is None:
+            self.refresh(build=False)
+        return [t for (p, id), t in self.ships.items() if p == player]
+
+    def names(self, player, shop=False):
+        """names of all ships of a player. shop=True: only the ships
+           the shop offers"""
+        return [t.name for t in self.templates(player) if t.shop or not shop]
+
+
+catalog = ShipCatalog()
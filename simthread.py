@@ -0,0 +1,96 @@
+"""
+simulation thread for vectorGame
+website: github.com/spheppner/vectorGame
+
+With PygView(threaded=True) the simulation steps run in a SimThread at
+a steady sim_rate, and the main thread only pumps events, samples the
+keyboard and joysticks and paints. After every step the SimThread
+publishes an immutable Snapshot (ship poses and hitpoints, cannons,
+a copy of the projectiles and the winner) into a DoubleBuffer; the
+main thread paints the newest one. A slow display.flip or a frame full
+of Lines then no longer delays the physics or the input sampling of
+the simulation.
+"""
+
+import collections
+import threading
+import time
+
+import profiling
+
+# ships: one (x, y, prevx, prevy, angle, hitpoints) tuple per player
+# published: time.perf_counter() when the step was done
+Snapshot = collections.namedtuple("Snapshot", "frame published ships cannons projectiles winner")
+
+
+class DoubleBuffer(object):
+    """two slots for snapshots. the writer fills the back slot and flips
+       it to the front, the reader gets the front slot. snapshots are
+       never changed after publishing, so the reader may keep using one
+       while the writer goes on"""
+
+    def __init__(self, first=None):
+        self.slots = [first, None]
+        self.front = 0
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, snapshot):
+        back = 1 - self.front
+        self.slots[back] = snapshot
+        with self.lock:
+            self.front = back
+            self.published += 1
+
+    def latest(self):
+        with self.lock:
+            return self.slots[self.front]
+
+
+class SimThread(threading.Thread):
+    """runs view.step() sim_rate times a second until the match ends.
+       the input of a step is view.live_input (set by the main thread)
+       or the next of view.inputs"""
+
+    def __init__(self, view):
+        threading.Thread.__init__(self, name="simulation")
+        self.daemon = True
+        self.view = view
+        self.buffer = DoubleBuffer(view.snapshot())
+        self.stopped = threading.Event()
+        self.late = 0   # steps that started more than one step late
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        view = self.view
+        dt = view.dt
+        next_step = time.perf_counter()
+        profile = None   # of this thread while F9 profiles, see profiling.py
+        try:
+            while not self.stopped.is_set():
+                profile = profiling.profiler.follow(profile)
+                now = time.perf_counter()
+                if now < next_step:
+                    time.sleep(min(next_step - now, 0.002))
+                    continue
+                if now - next_step > dt:
+                    self.late += 1
+                    if now - next_step > view.max_lag:
+                        next_step = now   # give up catching up, like run()
+                frame = view.live_input if view.inputs is None else next(view.inputs, None)
+                if frame is None or view.frames == view.max_frames:
+                    break
+                timer = view.step_timer   # one "frame" of it is one step
+                timer.begin()
+                view.step(dt, frame)
+                self.buffer.publish(view.snapshot())
+                timer.lap("publish")
+                timer.end()
+                next_step += dt
+                if view.winner:
+                    break
+        finally:
+            profiling.profiler.follow(profile, done=True)
+            self.stopped.set()
@@ -0,0 +1,61 @@
+"""
+uniform grid (spatial hash) broadphase for vectorGame
+website: github.com/spheppner/vectorGame
+
+The grid is rebuilt from a (n,2) array of points once per frame.
+Points are sorted by their cell key, so all points of one grid column
+between two rows form one contiguous slice that is found with a binary
+search. A query only looks at the cells touched by its circle, so its
+cost depends on how many points are near, not on how many exist.
+"""
+
+import math
+import numpy as np
+
+
+class SpatialHash(object):
+    """uniform grid over points. cellsize should be about the query radius"""
+    offset = 1 << 20   # keeps cell coordinates of off-screen points positive
+    stride = 1 << 21
+
+    def __init__(self, cellsize=60):
+        self.cellsize = cellsize
+        self.points = np.zeros((0, 2))
+        self.keys = np.zeros(0, dtype=np.int64)    # sorted cell keys
+        self.order = np.zeros(0, dtype=np.intp)    # point indices, sorted like keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rebuild(self, points):
+        """index all points, points is a (n,2) array"""
+        self.points = points
+        cells = np.floor_divide(points, self.cellsize).astype(np.int64) + self.offset
+        keys = cells[:, 0] * self.stride + cells[:, 1]
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def candidates(self, x, y, radius):
+        """indices of all points in the cells touched by the circle"""
+        cs = self.cellsize
+        x0 = int(math.floor((x - radius) / cs)) + self.offset
+        x1 = int(math.floor((x + radius) / cs)) + self.offset
+        y0 = int(math.floor((y - radius) / cs)) + self.offset
+        y1 = int(math.floor((y + radius) / cs)) + self.offset
+        pieces = []
+        for cx in range(x0, x1 + 1):
+            lo = np.searchsorted(self.keys, cx * self.stride + y0, "left")
+            hi = np.searchsorted(self.keys, cx * self.stride + y1, "right")
+            if hi > lo:
+                pieces.append(self.order[lo:hi])
+        if not pieces:
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate(pieces)
+
+    def query(self, x, y, radius):
+        """indices of all points closer than radius to (x, y)"""
+        near = self.candidates(x, y, radius)
+        if len(near) == 0:
+            return near
+        delta = self.points[near] - (x, y)
+        return near[(delta * delta).sum(axis=1) < radius * radius]
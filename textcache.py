@@ -0,0 +1,147 @@
+"""
+shared font and text cache for vectorGame
+website: github.com/spheppner/vectorGame
+
+pygame.font.SysFont searches the system fonts every time it is called,
+and Font.render draws the whole string again. Both results are kept
+here in least-recently-used caches, shared by the game, the menu and
+the textscroller:
+
+    import textcache
+    textcache.cache.draw(screen, "Player1: HP: 1000", 50, 30, (200,20,0))
+
+Finding a system font means scanning all installed fonts (fc-list on
+linux) once per process. The font file found for each (name, bold) is
+written to FONT_FILE, so later starts open the file directly.
+"""
+
+import collections
+import json
+import os
+import pygame
+
+FONT_FILE = os.path.join("data", "fontcache.json")
+
+
+class TextCache(object):
+    """LRU caches for fonts keyed by (name, size, bold) and for rendered
+       text surfaces keyed by (text, color, size, name, bold, antialias).
+       the rendered surfaces together stay below max_bytes of pixels"""
+
+    def __init__(self, max_fonts=16, max_bytes=4 * 1024 * 1024, font_file=FONT_FILE):
+        self.max_fonts = max_fonts
+        self.font_file = font_file
+        self.font_paths = None # "name|bold" -> [font file or None, set_bold]
+        self.max_bytes = max_bytes
+        self.fonts = collections.OrderedDict()
+        self.surfaces = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.font_hits = 0
+        self.font_misses = 0
+        self.quit_registered = False
+
+    def font(self, name="mono", size=24, bold=True):
+        """returns a pygame SysFont, looked up only the first time"""
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is not None:
+            self.font_hits += 1
+            self.fonts.move_to_end(key)
+            return font
+        self.font_misses += 1
+        if not self.quit_registered:
+            # pygame forgets registered functions after each quit
+            pygame.register_quit(self.reset)
+            self.quit_registered = True
+        path, set_bold = self.font_path(name, bold)
+        font = pygame.font.Font(path, size)
+        font.set_bold(set_bold)
+        self.fonts[key] = font
+        if len(self.fonts) > self.max_fonts:
+            self.fonts.popitem(last=False)
+        return font
+
+    def font_path(self, name="mono", bold=True):
+        """font file that pygame.font.SysFont would open, and whether the
+           font must be made bold by pygame. asks SysFont only if the
+           answer is not in font_file yet"""
+        if self.font_paths is None:
+            self.font_paths = {}
+            if self.font_file and os.path.exists(self.font_file):
+                try:
+                    with open(self.font_file, "r") as f:
+                        self.font_paths = json.load(f)
+                except ValueError:
+                    pass    # broken file, look the fonts up again
+        key = "{}|{}".format(name, int(bool(bold)))
+        found = self.font_paths.get(key)
+        if found and (found[0] is None or os.path.exists(found[0])):
+            return found[0], found[1]
+        found = []
+        def remember(path, size, set_bold, set_italic):
+            found.extend((path, set_bold))
+            return None
+        pygame.font.SysFont(name, 1, bold=bold, constructor=remember)
+        self.font_paths[key] = found
+        if self.font_file:
+            try:
+                with open(self.font_file, "w") as f:
+                    json.dump(self.font_paths, f, indent=1, sort_keys=True)
+            except (IOError, OSError):
+                pass    # read-only directory, look it up again next time
+        return found[0], found[1]
+
+    def render(self, text, color=(0,0,0), size=24, name="mono", bold=True, antialias=True):
+        """returns a surface with the text, rendered only the first time"""
+        key = (text, tuple(color), size, name, bold, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.font(name, size, bold).render(text, antialias, color)
+        self.surfaces[key] = surface
+        self.bytes += self.surface_bytes(surface)
+        while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+            oldkey, old = self.surfaces.popitem(last=False)
+            self.bytes -= self.surface_bytes(old)
+        return surface
+
+    def draw(self, screen, text, x=50, y=0, color=(0,0,0), size=24, name="mono",
+             bold=True, antialias=True, center=False):
+        """blit text on screen, topleft at x,y or centered around x,y.
+           returns the rect that was painted"""
+        surface = self.render(text, color, size, name, bold, antialias)
+        if center:
+            w, h = surface.get_size()
+            x -= w // 2
+            y -= h // 2
+        return screen.blit(surface, (x, y))
+
+    @staticmethod
+    def surface_bytes(surface):
+        w, h = surface.get_size()
+        return w * h * surface.get_bytesize()
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+    def reset(self):
+        """forget everything. fonts die with pygame.quit() and must not
+           be used after the next pygame.init()"""
+        self.fonts.clear()
+        self.clear()
+        self.quit_registered = False
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "font_hits": self.font_hits, "font_misses": self.font_misses,
+                "surfaces": len(self.surfaces), "bytes": self.bytes,
+                "fonts": len(self.fonts)}
+
+
+cache = TextCache()
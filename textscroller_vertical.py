@@ -9,6 +9,10 @@ import pygame
 import random
 import sys
 import os.path
+import math
+import textcache
+import profiling
+from scenes import Stage
 
 
       
@@ -20,15 +24,18 @@ class PygView(object):
   
     def __init__(self, text, width=640, height=400, fps=30, textcolor=(0,0,255), 
                  bgcolor=(255,255,255), font=('mono', 24, True), new_init=True,
-                 bg_filename=None, bg_object=None):
+                 bg_filename=None, bg_object=None, stage=None):
         """Initialize pygame, window, background, font,...
            default arguments 
+           stage: scenes.Stage shared with the menu. without one, pygame
+                  is initialized here if new_init is True
         """
         
         #pygame.mixer.pre_init(44100, -16, 2, 2048) 
 
-        if new_init:
-            pygame.init()
+        if stage is None and new_init:
+            stage = Stage(width, height)
+        self.stage = stage
         
         #jump = pygame.mixer.Sound(os.path.join('data','jump.wav'))  #load sound
         #self.sound1 = pygame.mixer.Sound(os.path.join('data','Pickup_Coin.wav'))
@@ -41,12 +48,18 @@ class PygView(object):
         self.lines = text.split("\n")
         self.width = width
         self.height = height
-        self.screen = pygame.display.set_mode((self.width, self.height), pygame.DOUBLEBUF)
+        if stage is None:
+            self.screen = pygame.display.set_mode((self.width, self.height), pygame.DOUBLEBUF)
+        else:
+            self.screen = stage.resize(self.width, self.height)
         self.background = pygame.Surface(self.screen.get_size()).convert()  
         if bg_object is not None:
             self.background = bg_object
         elif bg_filename is None:
-           self.background.fill(self.bgcolor) # fill background white
+           if stage is not None:
+               self.background = stage.background(self.bgcolor) # shared, never painted on
+           else:
+               self.background.fill(self.bgcolor) # fill background white
         else:
            try:
                print("i try to load:", bg_filename)
@@ -62,15 +75,34 @@ class PygView(object):
         self.x = 100
         self.dy = 50
         self.text_height = len(self.lines) * self.dy
-        self.bold = font[2]
-        self.font = pygame.font.SysFont(font[0], font[1], self.bold)
+        self.fontname, self.fontsize, self.bold = font
+        self.font = textcache.cache.font(self.fontname, self.fontsize, self.bold)
+        self.line_surfaces = [None] * len(self.lines) # rendered when first visible
+
+    def enter(self):
+        """see scenes.py"""
+        pygame.display.set_caption("Press ESC to go back")
+        if self.stage is not None:
+            self.screen = self.stage.resize(self.width, self.height)
 
     def paint(self):
-        """painting on the surface"""
-        y = self.offset_y
-        for line in self.lines:
-            self.draw_text(line, self.x, y, self.textcolor, self.bold )
-            y+= self.dy
+        """painting on the surface. only the lines inside the window are
+           blitted, each line is rendered the first time it shows up"""
+        first, last = self.visible_lines()
+        for i in range(first, last):
+            surface = self.line_surfaces[i]
+            if surface is None:
+                surface = textcache.cache.render(self.lines[i], self.textcolor, self.fontsize,
+                                                 self.fontname, self.bold, self.bold)
+                self.line_surfaces[i] = surface
+            self.screen.blit(surface, (self.x, self.offset_y + i * self.dy))
+
+    def visible_lines(self):
+        """first and last+1 index of the lines between y=0 and y=height"""
+        lineheight = self.font.get_linesize()
+        first = int(math.floor((-self.offset_y - lineheight) / self.dy)) + 1
+        last = int(math.ceil((self.height - self.offset_y) / self.dy))
+        return max(0, first), min(len(self.lines), last)
                 
 
     def run(self):
@@ -85,6 +117,8 @@ class PygView(object):
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
+                    if event.key == pygame.K_F9:
+                        profiling.profiler.toggle()
                     if event.key==pygame.K_UP:
                         #print(m.active_itemnumber)
                         self.offset_y += 50
@@ -121,9 +155,8 @@ class PygView(object):
         
         """Center text in window
         """
-        fw, fh = self.font.size(text)
-        surface = self.font.render(text, bold, color)
-        self.screen.blit(surface, (x,y))
+        return textcache.cache.draw(self.screen, text, x, y, color, self.fontsize,
+                                    self.fontname, self.bold, antialias=bold)
 
     
 ####
@@ -0,0 +1,185 @@
+"""
+tournament of headless matches for vectorGame
+website: github.com/spheppner/vectorGame
+
+Plays every combination of player1 plane, player2 plane, player1
+colour and player2 colour (planes from data/ships.json, colours from
+vectorgame.COLOURS) `--repeats` times, one match per process on all
+cores, and prints win rates, match lengths and step times:
+
+    python tournament.py                       # all combinations, 2 repeats
+    python tournament.py --repeats 10 --frames 3600 --json result.json
+
+Each worker process has its own headless scenes.Stage; every match is
+a new PygView, so nothing is shared between matches. Matches are
+repeatable: match i uses seed --seed + i for the game and for the
+scripted pilots. --pilots chooses who flies: scripted key presses,
+controllers.Bot for both, or a bot as player2 against the script.
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import vectorgame
+import controllers
+from ships import catalog
+from scenes import Stage
+
+# forward, backward, left, right, fire
+PILOT_KEYS = ((pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d, pygame.K_LCTRL),
+              (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_RCTRL))
+
+_stage = None   # the Stage of this worker process
+
+
+def scripted_inputs(seed, steps):
+    """repeatable random pilots for both players: each player holds a
+       random set of keys for 0.1 to 1 second, and fires most of the time"""
+    r = random.Random(seed)
+    held = [(), ()]
+    left = [0, 0]
+    for _ in range(steps):
+        for number, (forward, backward, turnleft, turnright, fire) in enumerate(PILOT_KEYS):
+            if left[number] == 0:
+                keys = []
+                x = r.random()
+                if x < 0.6:
+                    keys.append(forward)
+                elif x < 0.7:
+                    keys.append(backward)
+                x = r.random()
+                if x < 0.35:
+                    keys.append(turnleft)
+                elif x < 0.7:
+                    keys.append(turnright)
+                if r.random() < 0.8:
+                    keys.append(fire)
+                held[number] = keys
+                left[number] = r.randint(12, 120)
+            left[number] -= 1
+        yield vectorgame.keys_input(*(held[0] + held[1]))
+
+
+def combinations():
+    """(planes, colours) of every possible match"""
+    planes1 = [t.id for t in catalog.templates(1)]
+    planes2 = [t.id for t in catalog.templates(2)]
+    return [((p1, p2), (c1, c2)) for p1, p2, c1, c2 in
+            itertools.product(planes1, planes2, vectorgame.COLOURS[0], vectorgame.COLOURS[1])]
+
+
+def setup_worker(directory):
+    global _stage
+    os.chdir(directory)   # data files
+    _stage = Stage(headless=True)
+
+
+def play(task):
+    """one match, returns PygView.result() plus step time statistics"""
+    number, planes, colours, seed, frames, pilots = task
+    bots = {"scripted": (None, None), "bot": (controllers.Bot(), controllers.Bot()),
+            "mixed": (None, controllers.Bot())}[pilots]
+    view = vectorgame.PygView(headless=True, stage=_stage, seed=seed, planes=planes,
+                              colours=colours, max_frames=frames, controllers=bots)
+    view.paint()
+    times = []
+    started = time.perf_counter()
+    for frame in scripted_inputs(seed, frames):
+        t = time.perf_counter()
+        view.step(view.dt, frame)
+        times.append(time.perf_counter() - t)
+        if view.winner:
+            break
+    result = view.result()
+    times = np.array(times) * 1000.0
+    result.update(number=number, seconds=time.perf_counter() - started,
+                  step_p50=float(np.percentile(times, 50)),
+                  step_p95=float(np.percentile(times, 95)),
+                  step_max=float(times.max()))
+    return result
+
+
+def summary(results, key):
+    """win rates and match lengths of the results, grouped by key(result)"""
+    groups = collections.OrderedDict()
+    for r in sorted(results, key=key):
+        groups.setdefault(key(r), []).append(r)
+    rows = []
+    for name, group in groups.items():
+        winners = [r["winner"] for r in group]
+        rows.append({"group": name, "matches": len(group),
+                     "p1_wins": winners.count(1) / float(len(group)),
+                     "p2_wins": winners.count(2) / float(len(group)),
+                     "draws": winners.count(None) / float(len(group)),
+                     "frames": float(np.mean([r["frames"] for r in group]))})
+    return rows
+
+
+def report(results, processes, seconds):
+    print("{} matches on {} processes in {:.1f} s".format(len(results), processes, seconds))
+    tables = collections.OrderedDict((
+        ("planes", summary(results, lambda r: " vs ".join(r["planes"]))),
+        ("colours", summary(results, lambda r: " vs ".join(r["colours"]))),
+    ))
+    for title, rows in tables.items():
+        print("\n{:28} {:>7} {:>7} {:>7} {:>7} {:>9}".format(title, "matches", "p1 win", "p2 win",
+                                                            "draw", "frames"))
+        for row in rows:
+            print("{group:28} {matches:7} {p1_wins:7.0%} {p2_wins:7.0%} {draws:7.0%} {frames:9.0f}".format(**row))
+    steps = {"p50": float(np.median([r["step_p50"] for r in results])),
+             "p95": float(np.max([r["step_p95"] for r in results])),
+             "max": float(np.max([r["step_max"] for r in results]))}
+    print("\nstep time: median p50 {p50:.3f} ms, worst p95 {p95:.3f} ms, max {max:.3f} ms".format(**steps))
+    tables["steps"] = steps
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="vectorGame tournament of headless matches")
+    parser.add_argument("--repeats", type=int, default=2, help="matches per combination")
+    parser.add_argument("--frames", type=int, default=120 * 60,
+                        help="longest match in simulation steps (120 per second)")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--pilots", choices=("scripted", "bot", "mixed"), default="scripted")
+    parser.add_argument("--json", help="write all results and the summary to this file")
+    args = parser.parse_args(argv)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(directory)
+    tasks = [(number, planes, colours, args.seed + number, args.frames, args.pilots)
+             for number, (planes, colours) in
+             enumerate(combinations() * args.repeats)]
+    started = time.perf_counter()
+    pool = multiprocessing.Pool(args.processes, setup_worker, (directory,))
+    try:
+        results = []
+        for result in pool.imap_unordered(play, tasks):
+            results.append(result)
+            sys.stdout.write("\r{}/{} matches".format(len(results), len(tasks)))
+            sys.stdout.flush()
+        print()
+    finally:
+        pool.close()
+        pool.join()
+    results.sort(key=lambda r: r["number"])
+    tables = report(results, args.processes, time.perf_counter() - started)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"matches": results, "summary": tables}, f, indent=1)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,25 @@ import pygame
 import operator
 import math
 import time
+import sys
+import os
+import collections
+import copy
+import itertools
+import numpy as np
+from projectiles import Projectiles
+from spatialhash import SpatialHash
+from polygon import segments_hit_polygon
+import textcache
+import profiling
+from renderer import Renderer
+from ships import ShipTemplate, catalog
+from scenes import Stage
+from frametimes import FrameTimer
+from replay import InputRecorder
+from controllers import BUTTONS
+from simthread import SimThread, Snapshot
+from rewind import Rewind
 
 """
 author: Simon HEPPNER
@@ -11,14 +30,19 @@ email: simon@heppner.at
 name of game: vectorGame
 """
 
+# exact types that take the scalar fast path of the Vec2d operators
+_NUMBERS = frozenset((int, float))
+
 class Vec2d(object):
     """2d vector class, supports vector and scalar operators,
-       and also provides a bunch of high level functions
+       and also provides a bunch of high level functions.
+       the operators check first for exactly Vec2d and exactly int or
+       float, and only then for subclasses and other sequences
        """
     __slots__ = ['x', 'y']
 
     def __init__(self, x_or_pair, y = None):
-        if y == None:
+        if y is None:
             self.x = x_or_pair[0]
             self.y = x_or_pair[1]
         else:
@@ -67,6 +91,9 @@ class Vec2d(object):
     # Generic operator handlers
     def _o2(self, other, f):
         "Any two-operator operation where the left operand is a Vec2d"
+        if type(other) in _NUMBERS:
+            return Vec2d(f(self.x, other),
+                         f(self.y, other))
         if isinstance(other, Vec2d):
             return Vec2d(f(self.x, other.x),
                          f(self.y, other.y))
@@ -79,6 +106,9 @@ class Vec2d(object):
 
     def _r_o2(self, other, f):
         "Any two-operator operation where the right operand is a Vec2d"
+        if type(other) in _NUMBERS:
+            return Vec2d(f(other, self.x),
+                         f(other, self.y))
         if (hasattr(other, "__getitem__")):
             return Vec2d(f(other[0], self.x),
                          f(other[1], self.y))
@@ -88,7 +118,10 @@ class Vec2d(object):
 
     def _io(self, other, f):
         "inplace operator"
-        if (hasattr(other, "__getitem__")):
+        if type(other) in _NUMBERS:
+            self.x = f(self.x, other)
+            self.y = f(self.y, other)
+        elif (hasattr(other, "__getitem__")):
             self.x = f(self.x, other[0])
             self.y = f(self.y, other[1])
         else:
@@ -98,6 +131,10 @@ class Vec2d(object):
 
     # Addition
     def __add__(self, other):
+        if type(other) is Vec2d:
+            return Vec2d(self.x + other.x, self.y + other.y)
+        if type(other) in _NUMBERS:
+            return Vec2d(self.x + other, self.y + other)
         if isinstance(other, Vec2d):
             return Vec2d(self.x + other.x, self.y + other.y)
         elif hasattr(other, "__getitem__"):
@@ -107,9 +144,12 @@ class Vec2d(object):
     __radd__ = __add__
 
     def __iadd__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) is Vec2d:
             self.x += other.x
             self.y += other.y
+        elif type(other) in _NUMBERS:
+            self.x += other
+            self.y += other
         elif hasattr(other, "__getitem__"):
             self.x += other[0]
             self.y += other[1]
@@ -120,6 +160,10 @@ class Vec2d(object):
 
     # Subtraction
     def __sub__(self, other):
+        if type(other) is Vec2d:
+            return Vec2d(self.x - other.x, self.y - other.y)
+        if type(other) in _NUMBERS:
+            return Vec2d(self.x - other, self.y - other)
         if isinstance(other, Vec2d):
             return Vec2d(self.x - other.x, self.y - other.y)
         elif (hasattr(other, "__getitem__")):
@@ -134,9 +178,12 @@ class Vec2d(object):
         else:
             return Vec2d(other - self.x, other - self.y)
     def __isub__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) is Vec2d:
             self.x -= other.x
             self.y -= other.y
+        elif type(other) in _NUMBERS:
+            self.x -= other
+            self.y -= other
         elif (hasattr(other, "__getitem__")):
             self.x -= other[0]
             self.y -= other[1]
@@ -147,6 +194,8 @@ class Vec2d(object):
 
     # Multiplication
     def __mul__(self, other):
+        if type(other) in _NUMBERS:
+            return Vec2d(self.x*other, self.y*other)
         if isinstance(other, Vec2d):
             return Vec2d(self.x*other.x, self.y*other.y)
         if (hasattr(other, "__getitem__")):
@@ -156,7 +205,10 @@ class Vec2d(object):
     __rmul__ = __mul__
 
     def __imul__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) in _NUMBERS:
+            self.x *= other
+            self.y *= other
+        elif isinstance(other, Vec2d):
             self.x *= other.x
             self.y *= other.y
         elif (hasattr(other, "__getitem__")):
@@ -183,11 +235,13 @@ class Vec2d(object):
         return self._io(other, operator.floordiv)
 
     def __truediv__(self, other):
+        if type(other) in _NUMBERS:
+            return Vec2d(self.x / other, self.y / other)
         return self._o2(other, operator.truediv)
     def __rtruediv__(self, other):
         return self._r_o2(other, operator.truediv)
     def __itruediv__(self, other):
-        return self._io(other, operator.floordiv)
+        return self._io(other, operator.truediv)
 
     # Modulo
     def __mod__(self, other):
@@ -242,6 +296,29 @@ class Vec2d(object):
     def __invert__(self):
         return Vec2d(-self.x, -self.y)
 
+    # in-place helpers for hot loops, they create no new Vec2d
+    def set(self, x, y):
+        self.x = x
+        self.y = y
+        return self
+
+    def add_xy(self, x, y):
+        self.x += x
+        self.y += y
+        return self
+
+    def add_scaled(self, other, factor):
+        """self += other * factor"""
+        self.x += other.x * factor
+        self.y += other.y * factor
+        return self
+
+    def scale(self, factor):
+        """self *= factor, for a number"""
+        self.x *= factor
+        self.y *= factor
+        return self
+
     # vectory functions
     def get_length_sqrd(self):
         return self.x**2 + self.y**2
@@ -338,46 +415,266 @@ class Vec2d(object):
         self.x, self.y = dict
 
 
+class Vec2dArray(object):
+    """n 2d vectors in one (n,2) numpy array. supports the Vec2d
+       operators and functions element-wise; the other operand may be a
+       Vec2dArray, a Vec2d or (x, y) tuple, a number, or a 1-d array of n
+       numbers (see _other). functions that return a number for Vec2d
+       return a numpy array
+       """
+    __slots__ = ['a']
+
+    def __init__(self, data=()):
+        if isinstance(data, Vec2dArray):
+            data = data.a.copy()
+        elif isinstance(data, (list, tuple)) and data and isinstance(data[0], Vec2d):
+            data = self._unpack(data)
+        self.a = np.asarray(data, dtype=float).reshape(-1, 2)
+
+    @staticmethod
+    def _unpack(vectors):
+        """(n,2) array from a sequence of Vec2d, iterating in C"""
+        flat = itertools.chain.from_iterable(map(operator.attrgetter("x", "y"), vectors))
+        return np.fromiter(flat, dtype=float, count=2 * len(vectors)).reshape(-1, 2)
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        return cls(cls._unpack(vectors))
+
+    def to_vectors(self):
+        """list of Vec2d"""
+        return list(map(Vec2d, self.a[:, 0].tolist(), self.a[:, 1].tolist()))
+
+    def copy(self):
+        return Vec2dArray(self.a.copy())
+
+    def __len__(self):
+        return len(self.a)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            x, y = self.a[key].tolist()
+            return Vec2d(x, y)
+        return Vec2dArray(self.a[key])
+
+    def __setitem__(self, key, value):
+        self.a[key] = self._other(value)
+
+    def __iter__(self):
+        return iter(self.to_vectors())
+
+    def __repr__(self):
+        return 'Vec2dArray(%s)' % self.a.tolist()
+
+    @property
+    def x(self):
+        return self.a[:, 0]
+
+    @property
+    def y(self):
+        return self.a[:, 1]
+
+    # Generic operator handlers
+    def _other(self, other):
+        """the other operand as something that broadcasts against (n,2).
+           one vector is a Vec2d, a tuple or list (x, y), or an array of
+           shape (1,2); n vectors are a Vec2dArray or an (n,2) array. a
+           1-d numpy array always holds one number per vector, even if
+           its length is 2"""
+        if isinstance(other, Vec2dArray):
+            return other.a
+        if isinstance(other, Vec2d):
+            return np.array((other.x, other.y))
+        if isinstance(other, np.ndarray):
+            return other[:, None] if other.ndim == 1 else other
+        if isinstance(other, (tuple, list)):
+            return np.array((other[0], other[1]), dtype=float)
+        return other
+
+    def __add__(self, other):
+        return Vec2dArray(self.a + self._other(other))
+    __radd__ = __add__
+
+    def __iadd__(self, other):
+        self.a += self._other(other)
+        return self
+
+    def __sub__(self, other):
+        return Vec2dArray(self.a - self._other(other))
+
+    def __rsub__(self, other):
+        return Vec2dArray(self._other(other) - self.a)
+
+    def __isub__(self, other):
+        self.a -= self._other(other)
+        return self
+
+    def __mul__(self, other):
+        return Vec2dArray(self.a * self._other(other))
+    __rmul__ = __mul__
+
+    def __imul__(self, other):
+        self.a *= self._other(other)
+        return self
+
+    def __truediv__(self, other):
+        return Vec2dArray(self.a / self._other(other))
+
+    def __rtruediv__(self, other):
+        return Vec2dArray(self._other(other) / self.a)
+
+    def __itruediv__(self, other):
+        self.a /= self._other(other)
+        return self
+
+    def __neg__(self):
+        return Vec2dArray(-self.a)
+
+    # vectory functions
+    def get_length_sqrd(self):
+        return (self.a * self.a).sum(axis=1)
+
+    def get_length(self):
+        return np.sqrt(self.get_length_sqrd())
+    length = property(get_length, None, None, "gets the magnitudes of the vectors")
+
+    def rotate(self, angle_degrees):
+        """rotate all vectors in place, by one angle or one angle each"""
+        radians = np.radians(angle_degrees)
+        cos = np.cos(radians)
+        sin = np.sin(radians)
+        x = self.a[:, 0].copy()
+        y = self.a[:, 1]
+        self.a[:, 0] = x*cos - y*sin
+        self.a[:, 1] = x*sin + y*cos
+
+    def rotated(self, angle_degrees):
+        result = self.copy()
+        result.rotate(angle_degrees)
+        return result
+
+    def get_angle(self):
+        return np.degrees(np.arctan2(self.a[:, 1], self.a[:, 0]))
+
+    def normalized(self):
+        """unit vectors, zero vectors stay zero"""
+        length = self.get_length()
+        return Vec2dArray(self.a / np.where(length == 0, 1.0, length)[:, None])
+
+    def perpendicular(self):
+        return Vec2dArray(np.column_stack((-self.a[:, 1], self.a[:, 0])))
+
+    def dot(self, other):
+        return (self.a * self._other(other)).sum(axis=1)
+
+    def cross(self, other):
+        o = np.broadcast_to(self._other(other), self.a.shape)
+        return self.a[:, 0] * o[:, 1] - self.a[:, 1] * o[:, 0]
+
+    def get_distance(self, other):
+        return np.sqrt(self.get_dist_sqrd(other))
+
+    def get_dist_sqrd(self, other):
+        d = self.a - self._other(other)
+        return (d * d).sum(axis=1)
+
+    def interpolate_to(self, other, range):
+        return Vec2dArray(self.a + (self._other(other) - self.a) * range)
+
+    def __getstate__(self):
+        return self.a.tolist()
+
+    def __setstate__(self, state):
+        self.a = np.array(state, dtype=float).reshape(-1, 2)
+
+
+# the game was tuned at 30 frames per second: friction, steering, Line
+# speed and Line age are given per 1/BASE_FPS second
+BASE_FPS = 30
+
+
+# random colours for the flashing ships, made once. an own Random keeps
+# the game's random numbers independent of painting
+_flash_random = random.Random(7)
+FLASH_COLORS = [(_flash_random.randint(0, 255), _flash_random.randint(0, 255),
+                 _flash_random.randint(0, 255)) for _ in range(251)]
+
+
 class Shape():
     number = 0
     
     def __init__(self, screen, startpoint, pointlist, zoom=1, angle=0, color=(255,0,0), width=1, borderBounce=True, friction=0.5, move=Vec2d(0,0)):
+        """pointlist is a ShipTemplate, or a list of points for a ship
+           of its own kind"""
         self.startpoint = startpoint
-        self.pointlist = pointlist
+        if not isinstance(pointlist, ShipTemplate):
+            pointlist = ShipTemplate(pointlist)
+        self.template = pointlist
         self.rotationpoint = Vec2d(0,0)
         self.zoom = zoom
         self.angle = angle
         self.color = color
         self.width = width
         self.screen = screen
-        self.hitpoints = 1000
+        self.hitpoints = pointlist.hitpoints
         self.number = Shape.number
         Shape.number += 1
         self.borderBounce = borderBounce
         #--- friction: 0 means no frictoin, 1 means no gliding
         self.friction = friction #0.1 # 0 or False means no friction
         self.move = Vec2d(move.x, move.y)
+        self.prevpoint = Vec2d(startpoint.x, startpoint.y) # startpoint before the last update
+        self._heading = (None, 1.0, 0.0) # angle, cos, sin, see forward
+        self._bounds = None # (zoom, table row, outline, radius, aabb), see get_bounds
+        self.flash = (self.number * 37) % len(FLASH_COLORS) # position in the colour cycle
+
+    @property
+    def pointlist(self):
+        """the outline turned by self.angle, as tuple of (x,y) tuples"""
+        return self.template.pose(self.angle)
         
-        
+    def get_bounds(self):
+        """returns outline, radius, aabb of the zoomed and rotated pointlist,
+           relative to startpoint. outline is a (k,2) numpy array, radius
+           the bounding circle and aabb is (minx, miny, maxx, maxy).
+           cached until rotate or a new zoom changes the geometry"""
+        index = self.template.index(self.angle)
+        if self._bounds is None or self._bounds[:2] != (self.zoom, index):
+            outline = self.template.outline(self.angle) * self.zoom
+            radius = self.template.radius * self.zoom
+            aabb = tuple(v * self.zoom for v in self.template.aabb(self.angle))
+            self._bounds = (self.zoom, index, outline, radius, aabb)
+        return self._bounds[2:]
     
-    def forward(self, delta=1):
-        deltavec = Vec2d(delta, 0)
-        deltavec.rotate(self.angle)
-        #self.startpoint += deltavec
-        self.move += deltavec
+    def forward(self, delta=1, k=1.0):
+        """push the ship by delta in its direction. k is the length of the
+           simulation step in 1/BASE_FPS seconds: a push of delta every
+           1/BASE_FPS second gives the same top speed as a smaller push
+           every k/BASE_FPS second"""
+        if k != 1.0 and self.friction < 1:
+            if self.friction:
+                f = (1 - self.friction) ** k
+                delta *= (1 - f) / f * (1 - self.friction) / self.friction
+            else:
+                delta *= k
+        if self._heading[0] != self.angle:
+            radians = math.radians(self.angle)
+            self._heading = (self.angle, math.cos(radians), math.sin(radians))
+        angle, cos, sin = self._heading
+        self.move.add_xy(delta * cos, delta * sin)
     
     def rotate(self, delta_angle=1):
-        """alters pointlist by rotation with angle from rotationpoint"""
+        """turns the ship. pointlist follows self.angle"""
         self.angle += delta_angle
-        #print(self.angle)
-        for point in self.pointlist:
-            point.rotate(delta_angle)    
         
     def update(self, seconds):
         """update movement. gets the seconds passed since last frame as parameter"""
-        self.startpoint += self.move * seconds
+        self.prevpoint.x = self.startpoint.x
+        self.prevpoint.y = self.startpoint.y
+        self.startpoint.add_scaled(self.move, seconds)
         if self.friction:
-            self.move *= (1-self.friction)
+            # friction is the part of move lost every 1/BASE_FPS second
+            self.move.scale((1-self.friction) ** (seconds * BASE_FPS))
         if self.borderBounce:
             if self.startpoint.x < 0:
                 self.startpoint.x = 0
@@ -392,20 +689,17 @@ class Shape():
                 self.startpoint.y = PygView.height
                 self.move.y = 0
         
-    def draw(self):
-        oldpoint = self.pointlist[0]
-        #pygame.draw.line(self.screen, self.color, (0,0),(100,10),2)
-        #pygame.draw.line(self.screen, self.color, (100,10),(10,150),2)
-        self.color = (random.randint(0, 255) ,random.randint(0, 255) ,random.randint(0, 255) ) 
-        for point in self.pointlist:
-            #print("painting from point", oldpoint.x, oldpoint.y, "to", point.x, point.y)
-            pygame.draw.line(self.screen, self.color,
-                (self.startpoint.x + oldpoint.x * self.zoom,
-                 self.startpoint.y + oldpoint.y * self.zoom),
-                (self.startpoint.x + point.x * self.zoom,
-                 self.startpoint.y + point.y * self.zoom)
-                 ,self.width)
-            oldpoint = point
+    def draw(self, alpha=1.0):
+        """paints the outline, returns the painted Rect.
+           alpha between 0 and 1 paints the ship between prevpoint and startpoint"""
+        x = self.prevpoint.x + (self.startpoint.x - self.prevpoint.x) * alpha
+        y = self.prevpoint.y + (self.startpoint.y - self.prevpoint.y) * alpha
+        zoom = self.zoom
+        points = [(x + px * zoom, y + py * zoom) for px, py in self.pointlist]
+        # flashing colour: next colour of the palette cycle
+        self.flash = (self.flash + 1) % len(FLASH_COLORS)
+        self.color = FLASH_COLORS[self.flash]
+        return pygame.draw.lines(self.screen, self.color, False, points, self.width)
                               
 class VectorSprite(pygame.sprite.Sprite):
     pointlist = []
@@ -436,73 +730,117 @@ class VectorSprite(pygame.sprite.Sprite):
         
            
 
-class Line():
-    
-    group = []
-    number = 0
-    maxage = 400
-    """this is not a native pygame sprite but instead a pygame surface"""
-    def __init__(self, screen, startpoint=Vec2d(5,5), move=Vec2d(1,0), radius = 50, color=(0,0,255), bossnumber=0):
-        """create a (black) surface and paint a blue Line on it"""
-        self.number = Line.number
-        Line.number += 1
-        #Line.group[self.number] = self
-        Line.group.append(self)
-        self.radius = radius
-        self.color = color
-        self.bossnumber = bossnumber # 
-        self.screen = screen
-        self.startpoint = Vec2d(startpoint.x, startpoint.y) # make a copy of the startpoint vector
-        self.move = move
-        self.age = 0
-        # create a rectangular surface for the Line 100x100
-        self.surface = pygame.Surface((2*self.radius,2*self.radius))    
-        # pygame.draw.circle(Surface, color, pos, radius, width=0) # from pygame documentation
-        #pygame.draw.circle(self.surface, color, (radius, radius), radius) # draw blue filled circle on Line surface
-        width = 1
-        pygame.draw.line(self.surface, self.color, (50,50),
-                    (50+self.move.x * 10, 50+self.move.y*10),width)
-        self.startpoint.x -= 50
-        self.startpoint.y -= 50
-        self.surface.set_colorkey((0,0,0)) # make black transparent
-        self.surface = self.surface.convert_alpha() # for faster blitting. 
-        
-    #def blit(self, background):
-        #"""blit the Line on the background"""
-        #background.blit(self.surface, ( self.x, self.y))
-        
-    def draw(self):
-        self.screen.blit(self.surface, (self.startpoint.x, self.startpoint.y))
-        self.startpoint += self.move
-        self.age += 1
-        
+# shot colours of player1 and player2, as written in data/colour_file*.txt
+COLOURS = (("green", "yellow", "red"), ("purple", "light_blue", "blue"))
+
+
+# keyboard keys and joystick slots that steer the ships, see FrameInput
+KEYS = (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d, pygame.K_LCTRL,
+        pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_RCTRL)
+KEYBITS = dict((key, 1 << bit) for bit, key in enumerate(KEYS))
+JOYSTICKS = 2  # joystick 0 steers player1, joystick 1 player2
+AXES = 4       # axes per joystick
+
+
+class FrameInput(collections.namedtuple("FrameInput", "keys axes buttons")):
+    """everything the players did in one frame.
+       keys: bitmask over KEYS, axes: JOYSTICKS*AXES floats,
+       buttons: one bitmask per joystick"""
+    __slots__ = ()
+
+    def pressed(self, key):
+        return bool(self.keys & KEYBITS[key])
+
+NO_INPUT = FrameInput(0, (0.0,) * (JOYSTICKS * AXES), (0,) * JOYSTICKS)
+
+
+def keys_input(*keys):
+    """FrameInput with the given keyboard keys held down"""
+    bits = 0
+    for key in keys:
+        bits |= KEYBITS[key]
+    return NO_INPUT._replace(keys=bits)
 
-        
 
 class PygView(object):
   
     width = 0
     height = 0
+    critical_distance = 60 # cellsize of the collision grid
+    damage = 50 # hitpoints lost per projectile hit
+  
+    speedfactor = 0.05 # speed of a Line, relative to the cannon length
+    max_lag = 0.25 # seconds the simulation may fall behind before it slows down
+    # phases of a frame for the frame time overlay (F3) and log, see frametimes.py
+    phases = ("wait", "input", "events", "projectiles", "ships", "collision", "firing",
+              "rewind", "hud", "ship draw", "projectile draw", "cannon draw", "flip")
+    # phases of a step in the SimThread, with threaded=True
+    sim_phases = ("projectiles", "ships", "collision", "firing", "rewind", "publish")
   
-    def __init__(self, width=1440, height=850, fps=30, visualmode = False):
+    def __init__(self, width=1440, height=850, fps=30, visualmode = False, dirty=False,
+                 headless=False, inputs=None, max_frames=None, sim_rate=120, stage=None,
+                 frame_log=None, seed=None, planes=None, colours=None, record=None,
+                 controllers=(None, None), threaded=False, rewind=None):
         """Initialize pygame, window, background, font,...
            default arguments 
+           dirty=True updates only the changed parts of the window, see renderer.py
+           headless=True runs without window and as fast as possible, see simulate()
+           inputs: iterable of FrameInput (one per simulation step) instead
+                   of keyboard and joysticks
+           max_frames: end the match after so many simulation steps
+           sim_rate: simulation steps per second, independent of fps
+           stage: the scenes.Stage of the menu. without one the match
+                  makes its own and quits pygame at the end
+           frame_log: file to append the time of each phase of each frame
+                      to (.csv or binary), default $VECTORGAME_FRAMETIMES
+           seed: for the random choice of planes and colours
+           planes, colours: (player1, player2) instead of the random choice
+           record: file to append the inputs of every step to, see replay.py.
+                   default $VECTORGAME_RECORD
+           controllers: (player1, player2), a controllers.Controller steers
+                        that player instead of keyboard and joystick
+           threaded=True runs the simulation in its own thread, see simthread.py
+           rewind: a rewind.Rewind keeping snapshots for Backspace and
+                   seeking. default a Rewind() unless headless, False for none
         """
-        pygame.init()
-        pygame.joystick.init()
-        self.joysticks = [pygame.joystick.Joystick(x) for x in range(pygame.joystick.get_count())]
-        for j in self.joysticks:
-            j.init()
-        pygame.display.set_caption("vectorGame | Press ESC to quit")
+        self.own_stage = stage is None
+        if stage is None:
+            stage = Stage(width, height, dirty, headless)
+        self.stage = stage
+        self.headless = headless or stage.headless
+        self.joysticks = stage.joysticks
         PygView.width = width    # also self.width 
         PygView.height = height  # also self.height
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        self.background = pygame.Surface(self.screen.get_size()).convert()  
-        self.background.fill((255, 255, 255))
+        self.enter()
+        Shape.number = 0 # ship numbers (projectile owners) start again with every match
         self.clock = pygame.time.Clock()
         self.fps = fps
         self.playtime = 0.0
-        self.font = pygame.font.SysFont('mono', 24, bold=True)
+        self.frames = 0  # simulation steps done
+        self.sim_rate = sim_rate
+        self.dt = 1.0 / sim_rate
+        self.accumulator = 0.0 # real time not yet simulated
+        self.alpha = 1.0 # how far painting is between the last two steps
+        self.reload = [1.0, 1.0] # shots a player may fire, see trigger()
+        self.max_frames = max_frames
+        self.inputs = None if inputs is None else iter(inputs)
+        self.winner = None
+        self.fired = [0, 0]
+        self.controllers = list(controllers)
+        if frame_log is None:
+            frame_log = os.environ.get("VECTORGAME_FRAMETIMES")
+        self.frame_log = frame_log
+        self.timer = FrameTimer(self.phases, log=frame_log)
+        self.step_timer = self.timer # laps of step(), in the thread that runs it
+        self.threaded = threaded and not headless
+        self.live_input = NO_INPUT   # newest keyboard/joystick input, for the SimThread
+        if rewind is None:
+            rewind = not headless and Rewind()
+        self.rewind = rewind or None
+        self.rewind_request = None   # seconds to go back before the next step
+        self.font = textcache.cache.font('mono', 24, bold=True)
+        self.projectiles = Projectiles()
+        self.grid = SpatialHash(self.critical_distance)
         self.text_rectangle = ""
         self.canwin = True
         self.visual_mode = visualmode
@@ -515,6 +853,8 @@ class PygView(object):
         self.light_blue = (0, 255, 255)
         self.blue = (0, 0, 255)
         
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        random.seed(self.seed)
         with open("data/plane_file.txt", "r") as self.plane_file:
             self.active_plane = random.choice(self.plane_file.read().split(","))
         with open("data/colour_file.txt", "r") as self.colour_file:
@@ -523,316 +863,460 @@ class PygView(object):
             self.active_plane2 = random.choice(self.plane_file2.read().split(","))
         with open("data/colour_file2.txt", "r") as self.colour_file2:
             self.active_colour2 = random.choice(self.colour_file2.read().split(","))
+        if planes:
+            self.active_plane, self.active_plane2 = planes
+        if colours:
+            self.active_colour, self.active_colour2 = colours
+        self.shot_colours = [
+            [getattr(self, name) for name in COLOURS[0] if name in self.active_colour],
+            [getattr(self, name) for name in COLOURS[1] if name in self.active_colour2][:1]]
+        if record is None:
+            record = os.environ.get("VECTORGAME_RECORD")
+        self.recorder = None
+        if record:
+            self.recorder = InputRecorder(record, {
+                "seed": self.seed, "sim_rate": sim_rate, "width": width, "height": height,
+                "visualmode": visualmode, "planes": [self.active_plane, self.active_plane2],
+                "colours": [self.active_colour, self.active_colour2],
+                "date": time.strftime("%Y-%m-%d %H:%M:%S")})
+
+    def enter(self):
+        """get the window of the stage, see scenes.py"""
+        pygame.display.set_caption("vectorGame | Press ESC to quit")
+        self.screen = self.stage.resize(self.width, self.height)
+        self.background = self.stage.background((255, 255, 255))
+        self.renderer = Renderer(self.screen, self.background, self.stage.dirty)
 
     def paint(self):
         """painting ships on the surface"""
         
-        # --- Player1 Planes ---
-        standard = (Vec2d(0, 0), Vec2d(-25, 25), Vec2d(25, 0), Vec2d(-25, -25), Vec2d(0, 0))
-        rectangle = (Vec2d(-25, -25), Vec2d(25, -25), Vec2d(25, -10), Vec2d(0, 0), Vec2d(25, 10), Vec2d(25, 25), Vec2d(-25, 25), Vec2d(-25, -25))
-        diamond = (Vec2d(-5, -15), Vec2d(-5, 15), Vec2d(0, 25), Vec2d(25, 0), Vec2d(0, -25), Vec2d(-5, -15))
-        space_shuttle = (Vec2d(-25, -25), Vec2d(-25, 25), Vec2d(25, 10), Vec2d(25, -10), Vec2d(-25, -25))
-        dagger = (Vec2d(-25, -5), Vec2d(-25, 5), Vec2d(-5, 5), Vec2d(0, 15), Vec2d(5, 5), Vec2d(25, 0), Vec2d(5, -5), Vec2d(0, -15), Vec2d(-5, -5), Vec2d(-25, -5))
-        rocket = (Vec2d(-25, -5), Vec2d(-25, 5), Vec2d(-15, 5), Vec2d(-15, 15), Vec2d(-5, 15), Vec2d(5, 5), Vec2d(15, 5), Vec2d(25, 0), Vec2d(15, -5), Vec2d(5, -5), Vec2d(-5, -15), Vec2d(-15, -15), Vec2d(-15, -5), Vec2d(-25, -5))
-        standard2 = (Vec2d(0, 0), Vec2d(-25, 25), Vec2d(75, 0), Vec2d(-25, -25), Vec2d(0, 0))
-        pacman = (Vec2d(-25, -15), Vec2d(-25, 15), Vec2d(-15, 25), Vec2d(15, 25), Vec2d(25, 15), Vec2d(25, 10), Vec2d(5, 0), Vec2d(25, -10), Vec2d(25, -15), Vec2d(15, -25), Vec2d(-15, -25), Vec2d(-25, -15))
-        arrow = (Vec2d(5, -5), Vec2d(-25, -5), Vec2d(-5, 0), Vec2d(-25, 5), Vec2d(5, 5), Vec2d(25, 0), Vec2d(5, -5))
-        if "standard" == self.active_plane:
-            self.player1 = Shape(self.screen, Vec2d(100, 80), standard)
-            self.player1.draw()
-        elif "rectangle" == self.active_plane:
-            self.player1 = Shape(self.screen, Vec2d(100, 80), rectangle)
-            self.player1.draw()
-        elif "diamond" == self.active_plane:
-            self.player1 = Shape(self.screen, Vec2d(100, 80), diamond)
-            self.player1.draw()
-        elif "space_shuttle" == self.active_plane:
-            self.player1 = Shape(self.screen, Vec2d(100, 80), space_shuttle)
-            self.player1.draw()
-        elif "dagger" == self.active_plane:
-            self.player1 = Shape(self.screen, Vec2d(100, 80), dagger)
-            self.player1.draw()
-        elif "rocket" == self.active_plane:
-            self.player1 = Shape(self.screen, Vec2d(100, 80), rocket)
-            self.player1.draw()
-            
-        # --- Player2 Planes ---
-        
-        if "standard" == self.active_plane2:
-            self.player2 = Shape(self.screen, Vec2d(self.width-100, self.height-100), standard2)
-            self.player2.rotate(180)
-            self.player2.draw()
-        elif "pacman" == self.active_plane2:
-            self.player2 = Shape(self.screen, Vec2d(self.width-100, self.height-100), pacman)
-            self.player2.rotate(180)
-            self.player2.draw()
-        elif "arrow" == self.active_plane2:
-            self.player2 = Shape(self.screen, Vec2d(self.width-100, self.height-100), arrow)
-            self.player2.rotate(180)
-            self.player2.draw()                               
-         
+        catalog.refresh() # reads data/ships.json again only if it was changed
+        ship1 = catalog.get(1, self.active_plane)
+        ship2 = catalog.get(2, self.active_plane2)
+        self.player1 = Shape(self.screen, Vec2d(100, 80), ship1, friction=ship1.friction)
+        self.player1.draw()
+        self.player2 = Shape(self.screen, Vec2d(self.width-100, self.height-100), ship2, friction=ship2.friction)
+        self.player2.rotate(180)
+        self.player2.draw()
+        self.players = [self.player1, self.player2]
+        for number, controller in enumerate(self.controllers):
+            if controller is not None:
+                controller.reset(self, number)
+        if self.rewind is not None:
+            self.rewind.reset()
+        for colours, ship in zip(self.shot_colours, (ship1, ship2)):
+            if not colours: # no colour bought, shoot with the ship's colour
+                colours.append(getattr(self, ship.colour))
+        self.aim()
+
+    def read_input(self):
+        """sample keyboard and the first two joysticks into a FrameInput"""
+        pressed = pygame.key.get_pressed()
+        keys = 0
+        for bit, key in enumerate(KEYS):
+            if pressed[key]:
+                keys |= 1 << bit
+        axes = [0.0] * (JOYSTICKS * AXES)
+        buttons = [0] * JOYSTICKS
+        for number, j in enumerate(self.joysticks[:JOYSTICKS]):
+            for a in range(min(AXES, j.get_numaxes())):
+                axes[number * AXES + a] = j.get_axis(a)
+            for b in range(min(32, j.get_numbuttons())):
+                if j.get_button(b):
+                    buttons[number] |= 1 << b
+        return FrameInput(keys, tuple(axes), tuple(buttons))
+
+    def trigger(self, number, held, seconds):
+        """fire button of player number is held (or not) for seconds.
+           shoots BASE_FPS times per second, whatever the sim_rate"""
+        if not held:
+            self.reload[number] = 1.0
+            return
+        while self.reload[number] >= 1.0:
+            self.fire(number)
+            self.reload[number] -= 1.0
+        self.reload[number] += seconds * BASE_FPS
+
+    def fire(self, number):
+        """player number (0 or 1) shoots out of his cannon"""
+        player = self.players[number]
+        cannon = self.cannons[number]
+        move = cannon * self.speedfactor
+        for color in self.shot_colours[number]:
+            self.projectiles.spawn(player.startpoint + cannon, move, color=color, bossnumber=player.number)
+            self.fired[number] += 1
+
+    def steer(self, frame, k=1.0):
+        """apply joystick and keyboard input to the ships.
+           k is the length of the step in 1/BASE_FPS seconds"""
+        s1, s2 = self.player1.template, self.player2.template # speed and turn rate
+        # ---- joystick handler ------
+        # button 0: X, button 1: A, button 2: B, button 3: Y
+        x, y = frame.axes[0], frame.axes[1]
+        if x < -0.3:
+            self.player1.rotate(-s1.turn * -x * 1.5 * k)
+        if x > 0.3:
+            self.player1.rotate(s1.turn * x * 1.5 * k)
+        if y < -0.1:
+            self.player1.forward(s1.thrust, k)
+        if y > 0.3:
+            self.player1.forward(s1.reverse * 1.5, k)
+        x, y = frame.axes[AXES], frame.axes[AXES + 1]
+        if x < -0.3:
+            self.player2.rotate(-s2.turn * -x * 1.5 * k)
+        if x > 0.3:
+            self.player2.rotate(s2.turn * x * 1.5 * k)
+        if y < -0.3:
+            self.player2.forward(s2.thrust, k)
+        if y > 0.3:
+            self.player2.forward(s2.reverse, k)
+        # --------- pressed key handler --------------
+        if frame.pressed(pygame.K_w):
+            self.player1.forward(s1.thrust, k)
+        if frame.pressed(pygame.K_s):
+            self.player1.forward(s1.reverse, k)
+        if frame.pressed(pygame.K_a):
+            self.player1.rotate(-s1.turn * k)
+        if frame.pressed(pygame.K_d):
+            self.player1.rotate(s1.turn * k)
+        if frame.pressed(pygame.K_UP):
+            self.player2.forward(s2.thrust, k)
+        if frame.pressed(pygame.K_DOWN):
+            self.player2.forward(s2.reverse, k)
+        if frame.pressed(pygame.K_LEFT):
+            self.player2.rotate(-s2.turn * k)
+        if frame.pressed(pygame.K_RIGHT):
+            self.player2.rotate(s2.turn * k)
+
+    def control(self, frame, seconds):
+        """frame with the buttons of the controlled players in place of
+           their keyboard keys, joystick axes and buttons"""
+        keys, axes, buttons = frame.keys, list(frame.axes), list(frame.buttons)
+        for number, controller in enumerate(self.controllers):
+            if controller is None:
+                continue
+            shift = number * BUTTONS
+            keys &= ~(((1 << BUTTONS) - 1) << shift)
+            keys |= controller.buttons(self, number, seconds) << shift
+            axes[number * AXES:(number + 1) * AXES] = [0.0] * AXES
+            buttons[number] = 0
+        return FrameInput(keys, tuple(axes), tuple(buttons))
+
+    def aim(self):
+        """cannons point from each ship to the other one"""
+        d = self.player2.startpoint - self.player1.startpoint
+        d = d.normalized()
+        d *= 35
+        self.cannons = [d, -d]
+
+    def step(self, seconds, frame):
+        """game logic of one frame, no painting"""
+        if self.rewind_request is not None:
+            # here and not in handle_events, for the SimThread
+            self.rewind.back(self, self.rewind_request)
+            self.rewind_request = None
+        k = seconds * BASE_FPS
+        timer = self.step_timer
+        # ---- move and delete old Lines ----
+        self.projectiles.advance(k)
+        self.projectiles.expire()
+        # the grid serves the controllers and the collision detection
+        self.grid.rebuild(self.projectiles.pos[:self.projectiles.count])
+        timer.lap("projectiles")
+        if self.controllers != [None, None]:
+            frame = self.control(frame, seconds)
+        if self.recorder is not None:
+            self.recorder.record(frame)
+        self.frames += 1
+        self.playtime += seconds
+        self.steer(frame, k)
+        # --- Player Update() ---
+        for player in self.players:
+            player.update(seconds)
+        timer.lap("ships")
+        if self.visual_mode is False:
+            # ----- game over detection -----
+            if self.player1.hitpoints <= 0:
+                self.winner = 2
+                return
+            if self.player2.hitpoints <= 0:
+                self.winner = 1
+                return
+            # ----- collision detection -----
+            reach = self.projectiles.reach()
+            hits = [self.check_hits(player, reach) for player in self.players]
+            self.projectiles.remove_many(np.concatenate(hits))
+            timer.lap("collision")
+        # --------- (auto)fire -------
+        self.aim()
+        self.trigger(0, frame.pressed(pygame.K_LCTRL) or frame.buttons[0] & 2, seconds)
+        self.trigger(1, frame.pressed(pygame.K_RCTRL) or frame.buttons[1] & 2, seconds)
+        timer.lap("firing")
+        if self.rewind is not None:
+            self.rewind.capture(self)
+            timer.lap("rewind")
+
+    def draw(self, players=None, projectiles=None, cannons=None):
+        """paint ships, Lines, cannons and text of the current state,
+           or of the given copies of them (see draw_snapshot)"""
+        timer = self.timer
+        players = self.players if players is None else players
+        projectiles = self.projectiles if projectiles is None else projectiles
+        cannons = self.cannons if cannons is None else cannons
+        if self.visual_mode is False:
+            text_player1 = "Player1: HP: {}".format(players[0].hitpoints)
+            self.write(text_player1, x=50, y=30, color=(200,20,0))
+            text_player2 = "Player2: HP: {}".format(players[1].hitpoints)
+            self.write(text_player2, x=self.width-300, y=30, color=(0,20,200))
+        text_time = "FPS: {:4.3}".format(self.clock.get_fps())
+        self.write(text_time, x = self.width//2, y=30, color=(100,0,100), center=True)
+        if timer.visible:
+            self.renderer.add(timer.draw(self.screen, textcache.cache))
+            if self.step_timer is not timer:
+                y = 70 + 16 * (len(timer.lines()) + 1)
+                self.renderer.add(self.step_timer.draw(self.screen, textcache.cache, y=y))
+        if profiling.profiler.active:
+            self.write("PROFILING (F9)", x=self.width//2, y=60, color=(200,0,0), size=16, center=True)
+        timer.lap("hud")
+        # ----------draw ships ----------------
+        for player in players:
+            self.renderer.add(player.draw(self.alpha))
+        timer.lap("ship draw")
+        # -----draw Lines-----
+        back = (1.0 - self.alpha) * self.dt * BASE_FPS
+        self.renderer.add(projectiles.draw(self.screen, self.renderer.dirty, back))
+        timer.lap("projectile draw")
+        # -------- draw cannons -----------
+        for player, cannon in zip(players, cannons):
+            x = player.prevpoint.x + (player.startpoint.x - player.prevpoint.x) * self.alpha
+            y = player.prevpoint.y + (player.startpoint.y - player.prevpoint.y) * self.alpha
+            start = (x, y)
+            end = (x + cannon.x, y + cannon.y)
+            self.renderer.add(pygame.draw.line(self.screen, (0,0,0), start, end, 8))
+        timer.lap("cannon draw")
+
+    def draw_gameover(self):
+        if self.winner == 1:
+            text_gameover = "Player1 has won the game!"
+            color = (200,20,0)
+        else:
+            text_gameover = "Player2 has won the game!"
+            color = (0,20,200)
+        self.write(text_gameover, x=self.width//2, y=self.height//2, color=color, size=50, center=True)
+
+    def handle_events(self):
+        """keys pressed and released. returns False to end the match"""
+        running = True
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False 
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False 
+                elif event.key == pygame.K_f:
+                    self.fullscreen = True
+                elif event.key == pygame.K_F3:
+                    self.timer.toggle() # frame time overlay
+                    if self.step_timer is not self.timer:
+                        self.step_timer.toggle()
+                elif event.key == pygame.K_F9:
+                    profiling.profiler.toggle()
+                elif event.key == pygame.K_BACKSPACE and self.rewind is not None:
+                    self.rewind_request = self.rewind.step_back
+        return running
+
     def run(self):
         """The mainloop
         """
         self.paint() 
+        if self.threaded:
+            return self.run_threaded()
+        timer = self.timer
         running = True
-        while running:
-            # --------- update time -------------            
-            
-            milliseconds = self.clock.tick(self.fps)
-            seconds = milliseconds / 1000.0
-            self.playtime += seconds
-            if self.visual_mode is False:
-                text_player1 = "Player1: HP: {}".format(self.player1.hitpoints)
-                self.write(text_player1, x=50, y=30, color=(200,20,0))
-      
-                text_player2 = "Player2: HP: {}".format(self.player2.hitpoints)
-                self.write(text_player2, x=self.width-300, y=30, color=(0,20,200))
-                
-            text_time = "FPS: {:4.3}".format(self.clock.get_fps())
-            self.write(text_time, x = self.width//2, y=30, color=(100,0,100), center=True)
-            
-            
-            # ---- joystick handler ------
-            for number, j in enumerate(self.joysticks):
-                if number == 0:
-                    x = j.get_axis(0)
-                    y = j.get_axis(1)
-                    x2 = j.get_axis(2) # daniel black stick 4 alina red: 2
-                    y2 = j.get_axis(3)
-                    buttons = j.get_numbuttons()
-                    for b in range(buttons):
-                       pushed = j.get_button( b )
-                       if pushed and b == 0:                # button 0: X, button 1: A, button 2: B, button 3: Y
-                           print("button 0 was pressed.")
-                       elif pushed and b == 1:
-                           print("button 1 was pressed.")
-                           if "green" in self.active_colour:
-                               move = c * -speedfactor # + self.player1.move
-                               Line(self.screen, self.player1.startpoint-c, move, color=self.green, bossnumber=self.player1.number)
-                           if "yellow" in self.active_colour:
-                               move = c * -speedfactor # + self.player1.move
-                               Line(self.screen, self.player1.startpoint-c, move, color=self.yellow, bossnumber=self.player1.number)
-                           if "red" in self.active_colour:
-                               move = c * -speedfactor # + self.player1.move
-                               Line(self.screen, self.player1.startpoint-c, move, color=self.red, bossnumber=self.player1.number)
-                    if x < -0.3:
-                        self.player1.rotate(-5 * -x * 1.5)
-
-                    if x > 0.3:
-                        self.player1.rotate(5 * x * 1.5)
-                            
-                    if y < -0.1:
-                        self.player1.forward(150)
-
-                    if y > 0.3:
-                        self.player1.forward(-75)
-
-                if number == 1:
-                    x = j.get_axis(0)
-                    y = j.get_axis(1)
-                    buttons = j.get_numbuttons()
-                    for b in range(buttons):
-                        pushed = j.get_button( b )
-                        if pushed and b == 1:
-                            if "purple" in self.active_colour2:                                           
-                                move = d * -speedfactor 
-                                Line(self.screen, self.player2.startpoint-d,  move, color=self.purple, bossnumber=self.player2.number)  
-                            elif "light_blue" in self.active_colour2:
-                                move = d * -speedfactor 
-                                Line(self.screen, self.player2.startpoint-d,  move, color=self.light_blue, bossnumber=self.player2.number)  
-                            elif "blue" in self.active_colour2:
-                                move = d * -speedfactor 
-                                Line(self.screen, self.player2.startpoint-d,  move, color=self.blue, bossnumber=self.player2.number)  
-                    if x < -0.3:
-                        self.player2.rotate(-5 * -x * 1.5)
-                        
-                    if x > 0.3:
-                        self.player2.rotate(5 * x * 1.5)
-                            
-                    if y < -0.3:
-                        self.player2.forward(150)
-                            
-                    if y > 0.3:
-                        self.player2.forward(-50)
-            
-            # ------------ event handler: keys pressed and released -----
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False 
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        running = False 
-                    elif event.key == pygame.K_f:
-                        self.fullscreen = True
-            # --------- pressed key handler --------------            
-            pressed = pygame.key.get_pressed()            
-            if pressed[pygame.K_w]:
-                self.player1.forward(150)
-            if pressed[pygame.K_s]:
-                self.player1.forward(-50)
-            if pressed[pygame.K_a]:
-                self.player1.rotate(-5)
-            if pressed[pygame.K_d]:
-                self.player1.rotate(5)
-               
-            if pressed[pygame.K_UP]:
-                self.player2.forward(150)
-            if pressed[pygame.K_DOWN]:
-                self.player2.forward(-50)
-            if pressed[pygame.K_LEFT]:
-                self.player2.rotate(-5)
-            if pressed[pygame.K_RIGHT]:
-                self.player2.rotate(5)
-            
-            # --- Player1 Update() ---
-            
-            self.player1.update(seconds)
-            
-            # --- Player2 Update() ---
-            
-            self.player2.update(seconds)
-            
-            # ----------draw ships ----------------
-            
-            # --- Player1 Draw() ---
-            
-            self.player1.draw()
-                
-            # --- Player 2 Draw() ---
-            
-            self.player2.draw()
-            
-            # -----draw Lines-----
-            for b in Line.group:
-                b.draw()
-            # ---- delete old Lines ----
-            
-            Line.group = [b for b in Line.group if b.age < Line.maxage]
-            
-            # ----- game over detection -----
-            
-            # --- Player1 ---
-            if self.visual_mode is False:
-                if self.player1.hitpoints <= 0:
-                    text_gameover = "Player2 has won the game!"
-                    self.write(text_gameover, x=self.width//2, y=self.height//2, color=(0,20,200), size=50, center=True)
-                    time.sleep(5)
-                    return 100
-                
-                # --- Player2 ---
-                
-                if self.player2.hitpoints <= 0:
-                    text_gameover = "Player1 has won the game!"
-                    self.write(text_gameover, x=370, y=425, color=(200,20,0), size=50)
+        try:
+            while running:
+                timer.begin()
+                # --------- update time -------------            
+                if self.headless:
+                    # as fast as possible: exactly one simulation step per loop
+                    self.clock.tick()
+                    self.accumulator = self.dt
+                else:
+                    seconds = self.clock.tick(self.fps) / 1000.0
+                    # never try to catch up more than max_lag, or a slow
+                    # machine would fall further behind with every frame
+                    self.accumulator = min(self.accumulator + seconds, self.max_lag)
+                timer.lap("wait")
+                running = self.handle_events()
+                timer.lap("events")
+                if self.inputs is None:
+                    live = self.read_input()
+                timer.lap("input")
+                # --------- fixed simulation steps -------------
+                while running and self.accumulator >= self.dt:
+                    frame = live if self.inputs is None else next(self.inputs, None)
+                    if frame is None or self.frames == self.max_frames:
+                        running = False
+                        break
+                    self.step(self.dt, frame)
+                    self.accumulator -= self.dt
+                    if self.winner:
+                        if not self.headless:
+                            self.draw_gameover()
+                            self.renderer.show()
+                            time.sleep(5)
+                        return 100
+                if not self.headless and running:
+                    self.alpha = self.accumulator / self.dt
+                    self.draw()
+                    # ---------- update screen ----------- 
+                    self.renderer.show()
+                    timer.lap("flip")
+                timer.end()
+        finally:
+            # after the last step and after the game over screen alike
+            self.close_logs()
+            if self.own_stage:
+                self.stage.quit()
+        
+    def snapshot(self):
+        """immutable copy of everything draw() needs, see simthread.py"""
+        return Snapshot(self.frames, time.perf_counter(),
+                        tuple((p.startpoint.x, p.startpoint.y, p.prevpoint.x, p.prevpoint.y,
+                               p.angle, p.hitpoints) for p in self.players),
+                        tuple(Vec2d(c.x, c.y) for c in self.cannons),
+                        self.projectiles.snapshot(), self.winner)
+
+    def draw_snapshot(self, snap, ghosts):
+        """paint a Snapshot. ghosts are copies of the ships that only the
+           main thread changes"""
+        for ghost, (x, y, px, py, angle, hitpoints) in zip(ghosts, snap.ships):
+            ghost.startpoint.set(x, y)
+            ghost.prevpoint.set(px, py)
+            ghost.angle = angle
+            ghost.hitpoints = hitpoints
+        # how far the newest step is from being one step old
+        self.alpha = min(1.0, (time.perf_counter() - snap.published) / self.dt)
+        self.draw(ghosts, snap.projectiles, snap.cannons)
+
+    def run_threaded(self):
+        """mainloop with the simulation in a SimThread: events, input
+           and painting of the newest snapshot only"""
+        timer = self.timer
+        # not shared between threads. its log goes next to the frame log:
+        # frames.csv -> frames-sim.csv
+        log = None
+        if self.frame_log:
+            base, ext = os.path.splitext(self.frame_log)
+            log = base + "-sim" + ext
+        self.step_timer = FrameTimer(self.sim_phases, log=log, title="sim step ms")
+        self.step_timer.visible = timer.visible
+        ghosts = []
+        for player in self.players:
+            ghost = copy.copy(player)
+            ghost.startpoint = Vec2d(player.startpoint.x, player.startpoint.y)
+            ghost.prevpoint = Vec2d(player.prevpoint.x, player.prevpoint.y)
+            ghosts.append(ghost)
+        if self.inputs is None:
+            self.live_input = self.read_input()
+        sim = SimThread(self)
+        sim.start()
+        running = True
+        try:
+            while running:
+                timer.begin()
+                self.clock.tick(self.fps)
+                timer.lap("wait")
+                running = self.handle_events()
+                timer.lap("events")
+                if self.inputs is None:
+                    self.live_input = self.read_input()
+                timer.lap("input")
+                snap = sim.buffer.latest()
+                if snap.winner:
+                    sim.join()
+                    self.draw_snapshot(snap, ghosts)
+                    self.draw_gameover()
+                    self.renderer.show()
                     time.sleep(5)
                     return 100
-                        
-                # ----- collision detection -----
-                critical_distance = 60
-                for b in Line.group:
-                    
-                    # --- Player1 ---
-                    
-                    if b.bossnumber != self.player1.number:
-                        print("stufe 1")
-                        if (b.startpoint - self.player1.startpoint).get_length() < critical_distance:
-                            print("stufe 2")
-                            print("hp weniger")
-                            self.player1.hitpoints -= 1
-
-                    # --- Player2 ---
-                    
-                    if b.bossnumber != self.player2.number:
-                        if (b.startpoint - self.player2.startpoint).get_length() < critical_distance:
-                            self.player2.hitpoints -= 1
-            
-            # -------- draw cannons -----------
-            
-            # --- Player1 ---
-
-            d =  self.player2.startpoint - self.player1.startpoint 
-            d = d.normalized()
-            d *= 35
-            pygame.draw.line(self.screen, (0,0,0), (self.player1.startpoint.x,
-                                                    self.player1.startpoint.y),
-                                                    (self.player1.startpoint.x + d.x,
-                                                    self.player1.startpoint.y + d.y),
-                                                    8)
-            # --- Player2 ---
-            
-            c =  self.player1.startpoint - self.player2.startpoint 
-            c = c.normalized()
-            c *= 35
-            pygame.draw.line(self.screen, (0,0,0), (self.player2.startpoint.x,
-                                                    self.player2.startpoint.y),
-                                                    (self.player2.startpoint.x + c.x,
-                                                    self.player2.startpoint.y + c.y),
-                                                    8)
-                                                            
-            # --------- (auto)fire -------
-            #c *= 0.05
-            #d *= 0.05
-            speedfactor = 0.05
-            if pressed[pygame.K_LCTRL]:
-                if "green" in self.active_colour:
-                    move = c * -speedfactor # + self.player1.move
-                    Line(self.screen, self.player1.startpoint-c, move, color=self.green, bossnumber=self.player1.number)
-                if "yellow" in self.active_colour:
-                    move = c * -speedfactor # + self.player1.move
-                    Line(self.screen, self.player1.startpoint-c, move, color=self.yellow, bossnumber=self.player1.number)
-                if "red" in self.active_colour:
-                    move = c * -speedfactor # + self.player1.move
-                    Line(self.screen, self.player1.startpoint-c, move, color=self.red, bossnumber=self.player1.number)
-                if pressed[pygame.K_RCTRL]:  
-                    if "purple" in self.active_colour2:                                           
-                        move = d * -speedfactor 
-                        Line(self.screen, self.player2.startpoint-d,  move, color=self.purple, bossnumber=self.player2.number)  
-                    elif "light_blue" in self.active_colour2:
-                        move = d * -speedfactor 
-                        Line(self.screen, self.player2.startpoint-d,  move, color=self.light_blue, bossnumber=self.player2.number)  
-                    elif "blue" in self.active_colour2:
-                        move = d * -speedfactor 
-                        Line(self.screen, self.player2.startpoint-d,  move, color=self.blue, bossnumber=self.player2.number)
-
-            if pressed[pygame.K_RCTRL]:  
-                if "purple" in self.active_colour2:                                           
-                    move = d * -speedfactor 
-                    Line(self.screen, self.player2.startpoint-d,  move, color=self.purple, bossnumber=self.player2.number)  
-                elif "light_blue" in self.active_colour2:
-                    move = d * -speedfactor 
-                    Line(self.screen, self.player2.startpoint-d,  move, color=self.light_blue, bossnumber=self.player2.number)  
-                elif "blue" in self.active_colour2:
-                    move = d * -speedfactor 
-                    Line(self.screen, self.player2.startpoint-d,  move, color=self.blue, bossnumber=self.player2.number)  
-                if pressed[pygame.K_LCTRL]:
-                    if "green" in self.active_colour:
-                        move = c * -speedfactor # + self.player1.move
-                        Line(self.screen, self.player1.startpoint-c, move, color=self.green, bossnumber=self.player1.number)
-                    if "yellow" in self.active_colour:
-                        move = c * -speedfactor # + self.player1.move
-                        Line(self.screen, self.player1.startpoint-c, move, color=self.yellow, bossnumber=self.player1.number)
-                    if "red" in self.active_colour:
-                        move = c * -speedfactor # + self.player1.move
-                        Line(self.screen, self.player1.startpoint-c, move, color=self.red, bossnumber=self.player1.number)
-                           
-            # ---------- update screen ----------- 
-            pygame.display.flip()
-            self.screen.blit(self.background, (0, 0))
-            
-        pygame.quit()
-        
+                if sim.stopped.is_set():
+                    running = False   # inputs or max_frames are used up
+                self.draw_snapshot(snap, ghosts)
+                self.renderer.show()
+                timer.lap("flip")
+                timer.end()
+        finally:
+            sim.stop()
+            sim.join()
+            self.close_logs()
+            if self.own_stage:
+                self.stage.quit()
+
+    def close_logs(self):
+        """end of the match for the frame time logs and the input recording"""
+        self.timer.close()
+        self.step_timer.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def result(self):
+        """state of the match, see simulate()"""
+        return {"seed": self.seed,
+                "hitpoints": [p.hitpoints for p in self.players],
+                "winner": self.winner,
+                "playtime": self.playtime,
+                "frames": self.frames,
+                "fired": list(self.fired),
+                "planes": [self.active_plane, self.active_plane2],
+                "colours": [self.active_colour, self.active_colour2]}
+
+    def check_hits(self, player, reach=0):
+        """returns the indices of all projectiles of other players
+           touching the outline of player, and takes the hitpoints for
+           them. reach is the longest projectile line.
+           self.grid must be up to date"""
+        p = self.projectiles
+        outline, radius, (minx, miny, maxx, maxy) = player.get_bounds()
+        x, y = player.startpoint.x, player.startpoint.y
+        # --- quick rejection: bounding circle (grid) and box ---
+        near = self.grid.query(x, y, radius + reach)
+        near = near[p.owner[near] != player.number]
+        starts = p.pos[near] - (x, y)
+        inbox = ((starts[:, 0] > minx - reach) & (starts[:, 0] < maxx + reach) &
+                 (starts[:, 1] > miny - reach) & (starts[:, 1] < maxy + reach))
+        near = near[inbox]
+        starts = starts[inbox]
+        # --- exact test against the polygon ---
+        ends = starts + p.move[near] * p.length
+        hits = near[segments_hit_polygon(outline, starts, ends)]
+        player.hitpoints -= len(hits) * self.damage
+        return hits
+
     def write(self, text, x=50, y=150, color=(0,0,0), size=None, center=False):
         """write text on pygame surface. """
         if size is None:
             size = 24
-        font = pygame.font.SysFont('mono', size, bold=True)
-        fw, fh = font.size(text)
-        surface = font.render(text, True, color)
-        if center: # center text around x,y
-            self.screen.blit(surface, (x-fw//2, y-fh//2))
-        else:      # topleft corner is x,y
-            self.screen.blit(surface, (x,y))
+        rect = textcache.cache.draw(self.screen, text, x, y, color, size, center=center)
+        self.renderer.add(rect)
+        return rect
+
+def simulate(inputs=None, max_frames=None, seed=None, **kwargs):
+    """plays one match without window, as fast as the cpu allows.
+       inputs is an iterable of FrameInput, one per frame; the match ends
+       when a player is destroyed, inputs run out or after max_frames.
+       inputs=None is NO_INPUT for every frame when controllers= or
+       max_frames are given (a bot match), and no frame at all otherwise,
+       as nothing would ever end such a match.
+       seed makes the random choices (planes, colours) repeatable.
+       more keyword arguments go to PygView. returns a dict with
+       hitpoints, winner, playtime, frames, fired, planes and colours"""
+    if inputs is None:
+        endless = max_frames is not None or any(kwargs.get("controllers", ()))
+        inputs = itertools.repeat(NO_INPUT) if endless else ()
+    view = PygView(headless=True, inputs=inputs, max_frames=max_frames, seed=seed, **kwargs)
+    view.run()
+    return view.result()
 
 if __name__ == '__main__':
-    PygView().run()
+    PygView(dirty="--dirty" in sys.argv, threaded="--threaded" in sys.argv).run()